@@ -1,28 +1,122 @@
-from typing import Optional, Any
+from typing import Optional, Any, Callable
 from google.cloud import speech_v1  # type: ignore
 from google.cloud import texttospeech_v1  # type: ignore
-import urllib.request
-import urllib.error
+from google.cloud import storage  # type: ignore
+from google.cloud.speech_v1.services.speech.transports import SpeechGrpcTransport  # type: ignore
+from google.cloud.texttospeech_v1.services.text_to_speech.transports import TextToSpeechGrpcTransport  # type: ignore
+from google.api_core import exceptions as api_exceptions
+from google.api_core import retry as api_retry
+from collections import OrderedDict
+import functools
+import hashlib
+import logging
+import threading
 import os
+import uuid
+import requests
+from requests.adapters import HTTPAdapter
 
 
+logger = logging.getLogger(__name__)
+
 # Speech-to-Text client (initialized lazily)
 _speech_client: Optional[Any] = None
 
 # Text-to-Speech client (initialized lazily)
 _tts_client: Optional[Any] = None
 
+# Guards construction of the sync clients above; the prewarm thread and the first
+# requests may all reach the getters at once, and each client owns a gRPC channel
+_client_init_lock = threading.Lock()
+
+# gRPC channel options for the sync clients: HTTP/2 keepalive pings detect a dead
+# connection during a call instead of waiting for the RPC deadline
+_GRPC_CHANNEL_OPTIONS = [
+    ("grpc.keepalive_time_ms", 30000),
+    ("grpc.keepalive_timeout_ms", 10000),
+    ("grpc.http2.max_pings_without_data", 0),
+]
+
+# Explicit deadlines so a stuck probe is abandoned quickly instead of riding the
+# library default (which retries UNAVAILABLE for minutes)
+# Probes: sync recognize handles clips up to a minute, so allow time for that
+_PROBE_TIMEOUT = 15.0
+_TTS_TIMEOUT = 10.0
+_PROBE_RETRY = api_retry.Retry(initial=0.1, maximum=0.5, multiplier=2.0, timeout=_PROBE_TIMEOUT)
+_TTS_RETRY = api_retry.Retry(initial=0.1, maximum=1.0, multiplier=2.0, timeout=_TTS_TIMEOUT)
+
+# Cloud Storage client for staging large clips (initialized lazily)
+_storage_client: Optional[Any] = None
+
+# (encoding, sample_rate) candidates tried for each clip
+# LINE sends audio in M4A format (AAC); ENCODING_UNSPECIFIED without a sample rate
+# lets Google Cloud Speech detect the container format from the header.
+# A single MP3/16kHz fallback covers clips whose header auto-detect cannot parse;
+# candidates are tried in order, so the fallback is only sent (and billed) when
+# auto-detect fails or comes back empty.
+_RECOGNITION_ENCODINGS = (
+    (speech_v1.RecognitionConfig.AudioEncoding.ENCODING_UNSPECIFIED, 0),  # Auto-detect (0 = no sample rate)
+    (speech_v1.RecognitionConfig.AudioEncoding.MP3, 16000),
+)
+
+# Clips larger than this are staged in STT_SCRATCH_BUCKET and passed by gs:// URI
+# instead of being base64-encoded inline in the recognize request
+_INLINE_AUDIO_MAX_BYTES = 1_000_000
+_STT_SCRATCH_BUCKET = os.getenv('STT_SCRATCH_BUCKET')
+
+# In-memory LRU cache of synthesized audio, keyed by a hash of the synthesis parameters
+# Repeated phrases are served without another billable synthesize_speech call
+_TTS_CACHE_MAX_ENTRIES = 512
+_tts_cache: "OrderedDict[bytes, bytes]" = OrderedDict()
+_tts_cache_lock = threading.Lock()
+
+# In-memory LRU cache of (transcript, recognized language) pairs, keyed by a hash of the
+# clip and its language settings
+# A forwarded or re-sent voice message is answered without another billable recognize call
+_STT_CACHE_MAX_ENTRIES = 512
+_stt_cache: "OrderedDict[bytes, tuple[str, str]]" = OrderedDict()
+_stt_cache_lock = threading.Lock()
+
+# TTS voices by locale, with base-language entries for other locales of the same language
+# Using WaveNet voices for better quality
+_TTS_VOICE_MAP = {
+    'en-US': 'en-US-Wavenet-D',  # Male voice
+    'id-ID': 'id-ID-Wavenet-A',   # Female voice
+    'en': 'en-US-Wavenet-D',
+    'id': 'id-ID-Wavenet-A',
+}
+
+# Fallback to standard voices if WaveNet not available
+_TTS_FALLBACK_VOICE_MAP = {
+    'en-US': 'en-US-Standard-D',
+    'id-ID': 'id-ID-Standard-A',
+}
+
+# Errors meaning the requested voice is unavailable; only these trigger the Standard-voice fallback
+# Transient failures (UNAVAILABLE, RESOURCE_EXHAUSTED, ...) are raised instead of retried on another voice
+_VOICE_UNAVAILABLE_ERRORS = (api_exceptions.NotFound, api_exceptions.InvalidArgument)
+
+# Chunk size used when streaming downloaded audio into its buffer
+_DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# Shared HTTP session so LINE content downloads reuse pooled keep-alive TLS connections
+_http = requests.Session()
+_http.mount("https://", HTTPAdapter(pool_connections=10, pool_maxsize=50))
+
 
 def _get_speech_client() -> Any:
     """Get Speech-to-Text client, initializing if needed."""
     global _speech_client
     if _speech_client is None:
-        try:
-            _speech_client = speech_v1.SpeechClient()
-        except Exception as e:
-            print(f"ERROR: Failed to initialize Google Cloud Speech client: {e}")
-            print("Make sure GOOGLE_APPLICATION_CREDENTIALS is set or running on GCP")
-            raise
+        with _client_init_lock:
+            if _speech_client is None:
+                try:
+                    channel = SpeechGrpcTransport.create_channel(options=_GRPC_CHANNEL_OPTIONS)
+                    _speech_client = speech_v1.SpeechClient(transport=SpeechGrpcTransport(channel=channel))
+                except Exception as e:
+                    logger.error("Failed to initialize Google Cloud Speech client: %s", e)
+                    logger.error("Make sure GOOGLE_APPLICATION_CREDENTIALS is set or running on GCP")
+                    raise
     return _speech_client
 
 
@@ -30,13 +124,174 @@ def _get_tts_client() -> Any:
     """Get Text-to-Speech client, initializing if needed."""
     global _tts_client
     if _tts_client is None:
+        with _client_init_lock:
+            if _tts_client is None:
+                try:
+                    channel = TextToSpeechGrpcTransport.create_channel(options=_GRPC_CHANNEL_OPTIONS)
+                    _tts_client = texttospeech_v1.TextToSpeechClient(transport=TextToSpeechGrpcTransport(channel=channel))
+                except Exception as e:
+                    logger.error("Failed to initialize Google Cloud Text-to-Speech client: %s", e)
+                    logger.error("Make sure GOOGLE_APPLICATION_CREDENTIALS is set or running on GCP")
+                    raise
+    return _tts_client
+
+
+def _get_storage_client() -> Any:
+    """Get Cloud Storage client, initializing if needed."""
+    global _storage_client
+    if _storage_client is None:
         try:
-            _tts_client = texttospeech_v1.TextToSpeechClient()
+            _storage_client = storage.Client()
         except Exception as e:
-            print(f"ERROR: Failed to initialize Google Cloud Text-to-Speech client: {e}")
-            print("Make sure GOOGLE_APPLICATION_CREDENTIALS is set or running on GCP")
+            logger.error("Failed to initialize Google Cloud Storage client: %s", e)
+            logger.error("Make sure GOOGLE_APPLICATION_CREDENTIALS is set or running on GCP")
             raise
-    return _tts_client
+    return _storage_client
+
+
+def _recognition_audio(audio_content: bytes) -> tuple[Any, Optional[Any]]:
+    """
+    Build the RecognitionAudio for a clip.
+    
+    Large clips are uploaded to the scratch bucket (when STT_SCRATCH_BUCKET is set)
+    and referenced by URI so the payload travels over Google's network instead of
+    being encoded into the request.
+    
+    Returns:
+        Tuple of (RecognitionAudio, scratch blob to delete afterwards or None)
+    """
+    if _STT_SCRATCH_BUCKET and len(audio_content) > _INLINE_AUDIO_MAX_BYTES:
+        blob = _get_storage_client().bucket(_STT_SCRATCH_BUCKET).blob(f"stt-scratch/{uuid.uuid4().hex}")
+        blob.upload_from_string(audio_content, content_type="audio/mpeg")
+        return speech_v1.RecognitionAudio(uri=f"gs://{_STT_SCRATCH_BUCKET}/{blob.name}"), blob
+    return speech_v1.RecognitionAudio(content=audio_content), None
+
+
+def _delete_scratch_blob(blob: Any) -> None:
+    """Delete a staged scratch clip, logging rather than raising on failure."""
+    try:
+        blob.delete()
+    except Exception as e:
+        logger.warning("Failed to delete scratch audio %s: %s", blob.name, e)
+
+
+def stage_recognition_audio(audio_content: bytes) -> tuple[Any, Callable[[], None]]:
+    """
+    Prepare a clip once for several recognize_speech calls.
+    
+    A large clip is uploaded to the scratch bucket a single time instead of once
+    per recognition attempt.
+    
+    Args:
+        audio_content: Audio file content as bytes
+    
+    Returns:
+        Tuple of (RecognitionAudio to pass as recognize_speech(audio=...), release
+        callable that deletes the scratch copy once no attempt needs it)
+    """
+    audio, scratch_blob = _recognition_audio(audio_content)
+    if scratch_blob is None:
+        return audio, lambda: None
+    return audio, functools.partial(_delete_scratch_blob, scratch_blob)
+
+
+def _tts_cache_key(text: str, language_code: str, voice_name: str, audio_encoding: str, speaking_rate: float, pitch: float) -> bytes:
+    """Build a compact cache key from the text and every parameter that affects the synthesized audio."""
+    params = f"{voice_name}|{language_code}|{audio_encoding}|{speaking_rate}|{pitch}|".encode()
+    return hashlib.blake2b(params + text.encode(), digest_size=16).digest()
+
+
+def _tts_cache_get(key: bytes) -> Optional[bytes]:
+    """Return cached audio for key (marking it most recently used), or None on miss."""
+    with _tts_cache_lock:
+        audio = _tts_cache.get(key)
+        if audio is not None:
+            _tts_cache.move_to_end(key)
+        return audio
+
+
+def _tts_cache_put(key: bytes, audio: bytes) -> None:
+    """Store audio under key, evicting the least recently used entry when full."""
+    with _tts_cache_lock:
+        _tts_cache[key] = audio
+        _tts_cache.move_to_end(key)
+        while len(_tts_cache) > _TTS_CACHE_MAX_ENTRIES:
+            _tts_cache.popitem(last=False)
+
+
+def _stt_cache_key(audio_content: bytes, language_code: str, alternative_language_codes: Optional[list[str]]) -> bytes:
+    """Build a compact cache key from the audio bytes and the recognition languages."""
+    params = f"{language_code}|{','.join(alternative_language_codes or ())}|".encode()
+    return hashlib.blake2b(params + audio_content, digest_size=16).digest()
+
+
+def _stt_cache_get(key: bytes) -> Optional[tuple[str, str]]:
+    """Return the cached recognition for key (marking it most recently used), or None on miss."""
+    with _stt_cache_lock:
+        recognition = _stt_cache.get(key)
+        if recognition is not None:
+            _stt_cache.move_to_end(key)
+        return recognition
+
+
+def _stt_cache_put(key: bytes, recognition: tuple[str, str]) -> None:
+    """Store a recognition under key, evicting the least recently used entry when full."""
+    with _stt_cache_lock:
+        _stt_cache[key] = recognition
+        _stt_cache.move_to_end(key)
+        while len(_stt_cache) > _STT_CACHE_MAX_ENTRIES:
+            _stt_cache.popitem(last=False)
+
+
+@functools.lru_cache(maxsize=256)
+def _recognition_config(encoding: Any, sample_rate: int, language_code: str, alternative_languages: tuple[str, ...]) -> Any:
+    """Build (once per distinct combination) the RecognitionConfig protobuf for a recognize call."""
+    config_dict = {
+        "encoding": encoding,
+        "language_code": language_code,
+        "enable_automatic_punctuation": True,
+    }
+    
+    # Only set sample_rate if it's not 0 (0 means auto-detect)
+    if sample_rate > 0:
+        config_dict["sample_rate_hertz"] = sample_rate
+    
+    # Add alternative languages if available
+    if alternative_languages:
+        config_dict["alternative_language_codes"] = list(alternative_languages)
+    
+    return speech_v1.RecognitionConfig(**config_dict)
+
+
+def _build_recognition_configs(language_code: str, alternative_language_codes: Optional[list[str]] = None) -> list[tuple[Any, int, Any]]:
+    """Build the (encoding, sample_rate, RecognitionConfig) candidates tried for a clip."""
+    # Use provided alternative languages, or default to empty list
+    alternative_languages = alternative_language_codes or []
+    
+    alternatives_key = tuple(alternative_languages)
+    return [
+        (encoding, sample_rate, _recognition_config(encoding, sample_rate, language_code, alternatives_key))
+        for encoding, sample_rate in _RECOGNITION_ENCODINGS
+    ]
+
+
+def _first_transcript(response: Any) -> Optional[str]:
+    """Return the most confident non-empty transcript in a recognize response, if any."""
+    if response.results:
+        # Get the first result (most confident)
+        result = response.results[0]
+        if result.alternatives:
+            transcript = result.alternatives[0].transcript.strip()
+            if transcript:  # Only return if we got actual text
+                return transcript
+    return None
+
+
+def _recognized_language(response: Any, default: str) -> str:
+    """Return the language the first result was recognized in (lower-case BCP-47), or default if unreported."""
+    if response.results and response.results[0].language_code:
+        return response.results[0].language_code.lower()
+    return default.lower()
 
 
 def speech_to_text(audio_content: bytes, language_code: str, alternative_language_codes: Optional[list[str]] = None) -> str:
@@ -54,77 +309,101 @@ def speech_to_text(audio_content: bytes, language_code: str, alternative_languag
     Raises:
         Exception: If speech recognition fails
     """
+    return recognize_speech(audio_content, language_code, alternative_language_codes)[0]
+
+
+def recognize_speech(
+    audio_content: bytes,
+    language_code: str,
+    alternative_language_codes: Optional[list[str]] = None,
+    audio: Optional[Any] = None,
+) -> tuple[str, str]:
+    """
+    Convert audio content to text and report which of the candidate languages matched.
+    
+    Args:
+        audio_content: Audio file content as bytes
+        language_code: Language code (e.g., 'en-US', 'id-ID', 'zh-TW', 'es-ES', 'ja-JP', 'th-TH')
+        alternative_language_codes: Optional list of alternative language codes to try for better recognition
+        audio: RecognitionAudio from stage_recognition_audio, shared between attempts on the
+            same clip; built (and staged if large) for this call when omitted
+    
+    Returns:
+        Tuple of (transcribed text, recognized language code in lower case, e.g. 'en-us')
+    
+    Raises:
+        Exception: If speech recognition fails
+    """
+    cache_key = _stt_cache_key(audio_content, language_code, alternative_language_codes)
+    cached = _stt_cache_get(cache_key)
+    if cached is not None:
+        return cached
+    
+    scratch_blob = None
     try:
         client = _get_speech_client()
         
-        # Use provided alternative languages, or default to empty list
-        alternative_languages = alternative_language_codes or []
-        
-        # LINE sends audio in M4A format (AAC), but Google Cloud Speech supports various formats
-        # We'll try multiple encodings and sample rates
-        encodings_to_try = [
-            speech_v1.RecognitionConfig.AudioEncoding.ENCODING_UNSPECIFIED,  # Auto-detect (try first)
-            speech_v1.RecognitionConfig.AudioEncoding.MP3,
-            speech_v1.RecognitionConfig.AudioEncoding.OGG_OPUS,
-            speech_v1.RecognitionConfig.AudioEncoding.WEBM_OPUS,
-            speech_v1.RecognitionConfig.AudioEncoding.FLAC,
-        ]
-        
-        # Common sample rates for LINE audio (LINE typically uses 16kHz or 48kHz)
-        sample_rates_to_try = [0, 16000, 48000, 44100, 24000]  # 0 = auto-detect
-        
-        audio = speech_v1.RecognitionAudio(content=audio_content)
+        if audio is None:
+            audio, scratch_blob = _recognition_audio(audio_content)
+        configs = _build_recognition_configs(language_code, alternative_language_codes)
         
-        # Try each combination of encoding and sample rate
-        for encoding in encodings_to_try:
-            for sample_rate in sample_rates_to_try:
-                try:
-                    # Configure recognition settings
-                    # For ENCODING_UNSPECIFIED, sample_rate can be omitted or set to 0 for auto-detect
-                    config_dict = {
-                        "encoding": encoding,
-                        "language_code": language_code,
-                        "enable_automatic_punctuation": True,
-                    }
-                    
-                    # Only set sample_rate if it's not 0 (0 means auto-detect)
-                    if sample_rate > 0:
-                        config_dict["sample_rate_hertz"] = sample_rate
-                    
-                    # Add alternative languages if available
-                    if alternative_languages:
-                        config_dict["alternative_language_codes"] = alternative_languages
-                    
-                    config = speech_v1.RecognitionConfig(**config_dict)
-                    
-                    response = client.recognize(config=config, audio=audio)
-                    
-                    if response.results:
-                        # Get the first result (most confident)
-                        result = response.results[0]
-                        if result.alternatives:
-                            transcript = result.alternatives[0].transcript.strip()
-                            if transcript:  # Only return if we got actual text
-                                print(f"Successfully recognized with encoding={encoding}, sample_rate={sample_rate}")
-                                return transcript
-                    
-                    # If we get here, recognition returned no results
-                    # Try next combination
-                    continue
-                except Exception as e:
-                    # If this combination fails, try next one
-                    # Only log if it's not a common "no results" error
-                    if "no results" not in str(e).lower() and "empty" not in str(e).lower():
-                        print(f"Warning: Speech recognition with encoding={encoding}, sample_rate={sample_rate} failed: {e}")
-                    continue
+        # Try the auto-detect config first; the fallback is a second round-trip,
+        # but only for the rare clip whose header auto-detect cannot parse
+        for encoding, sample_rate, config in configs:
+            try:
+                response = client.recognize(
+                    request=speech_v1.RecognizeRequest(config=config, audio=audio),
+                    retry=_PROBE_RETRY,
+                    timeout=_PROBE_TIMEOUT,
+                )
+            except Exception as e:
+                # If this configuration fails, try the next one
+                # Only log if it's not a common "no results" error
+                if "no results" not in str(e).lower() and "empty" not in str(e).lower():
+                    logger.warning("Speech recognition with encoding=%s, sample_rate=%s failed: %s", encoding, sample_rate, e)
+                continue
+            
+            transcript = _first_transcript(response)
+            if transcript:
+                logger.debug("Successfully recognized with encoding=%s, sample_rate=%s", encoding, sample_rate)
+                recognition = (transcript, _recognized_language(response, language_code))
+                _stt_cache_put(cache_key, recognition)
+                return recognition
         
-        # If all combinations failed, raise an error with more details
-        raise Exception(f"Speech recognition failed for {language_code} with all attempted encoding/sample_rate combinations")
+        # If both configurations failed, raise an error with more details
+        raise Exception(f"Speech recognition failed for {language_code} with auto-detected and fallback encodings")
         
     except Exception as e:
-        print(f"ERROR in speech_to_text for {language_code}: {e}")
-        print(f"Audio content size: {len(audio_content)} bytes")
+        logger.error("Error in recognize_speech for %s: %s (audio content size: %d bytes)", language_code, e, len(audio_content))
         raise
+    finally:
+        if scratch_blob is not None:
+            _delete_scratch_blob(scratch_blob)
+
+
+def _select_tts_voice(language_code: str) -> tuple[str, Optional[str]]:
+    """
+    Select the WaveNet voice and its Standard fallback for a language.
+    
+    Raises:
+        ValueError: If the language has no configured voice
+    """
+    # Exact locale first, then the base language (e.g. 'en-GB' -> 'en')
+    voice_name = _TTS_VOICE_MAP.get(language_code) or _TTS_VOICE_MAP.get(language_code.split('-', 1)[0])
+    if not voice_name:
+        raise ValueError(f"Unsupported language code for TTS: {language_code}")
+    
+    return voice_name, _TTS_FALLBACK_VOICE_MAP.get(language_code)
+
+
+@functools.lru_cache(maxsize=64)
+def _voice_params(language_code: str, voice_name: str) -> Any:
+    """Build (once) the VoiceSelectionParams for a language/voice pair."""
+    return texttospeech_v1.VoiceSelectionParams(
+        language_code=language_code,
+        name=voice_name,
+        ssml_gender=texttospeech_v1.SsmlVoiceGender.NEUTRAL,
+    )
 
 
 def text_to_speech(text: str, language_code: str) -> bytes:
@@ -141,29 +420,16 @@ def text_to_speech(text: str, language_code: str) -> bytes:
     Raises:
         Exception: If TTS synthesis fails
     """
-    # Select appropriate voice based on language
-    # Using WaveNet voices for better quality
-    voice_map = {
-        'en-US': 'en-US-Wavenet-D',  # Male voice
-        'id-ID': 'id-ID-Wavenet-A',   # Female voice
-    }
+    voice_name, fallback_voice = _select_tts_voice(language_code)
     
-    # Fallback to standard voices if WaveNet not available
-    fallback_voice_map = {
-        'en-US': 'en-US-Standard-D',
-        'id-ID': 'id-ID-Standard-A',
-    }
+    speaking_rate = 1.0  # Normal speed
+    pitch = 0.0  # Normal pitch
     
-    voice_name = voice_map.get(language_code)
-    if not voice_name:
-        # Try to extract base language code
-        base_lang = language_code.split('-')[0]
-        if base_lang == 'en':
-            voice_name = 'en-US-Wavenet-D'
-        elif base_lang == 'id':
-            voice_name = 'id-ID-Wavenet-A'
-        else:
-            raise ValueError(f"Unsupported language code for TTS: {language_code}")
+    # Serve repeated phrases from the cache without a network round-trip
+    cache_key = _tts_cache_key(text, language_code, voice_name, "mp3", speaking_rate, pitch)
+    cached_audio = _tts_cache_get(cache_key)
+    if cached_audio is not None:
+        return cached_audio
     
     # Configure synthesis input
     synthesis_input = texttospeech_v1.SynthesisInput(text=text)
@@ -171,54 +437,74 @@ def text_to_speech(text: str, language_code: str) -> bytes:
     # Configure audio output
     audio_config = texttospeech_v1.AudioConfig(
         audio_encoding=texttospeech_v1.AudioEncoding.MP3,
-        speaking_rate=1.0,  # Normal speed
-        pitch=0.0,  # Normal pitch
+        speaking_rate=speaking_rate,
+        pitch=pitch,
     )
     
     try:
         client = _get_tts_client()
         
         # Configure voice
-        voice = texttospeech_v1.VoiceSelectionParams(
-            language_code=language_code,
-            name=voice_name,
-            ssml_gender=texttospeech_v1.SsmlVoiceGender.NEUTRAL,
-        )
+        voice = _voice_params(language_code, voice_name)
         
         # Perform synthesis
         response = client.synthesize_speech(
             input=synthesis_input,
             voice=voice,
-            audio_config=audio_config
+            audio_config=audio_config,
+            retry=_TTS_RETRY,
+            timeout=_TTS_TIMEOUT
         )
         
+        _tts_cache_put(cache_key, response.audio_content)
         return response.audio_content
         
     except Exception as e:
-        print(f"ERROR in text_to_speech: {e}")
+        logger.error("Error in text_to_speech: %s", e)
         # Try with fallback voice if WaveNet fails
-        if 'Wavenet' in str(e) or 'not found' in str(e).lower():
+        if isinstance(e, _VOICE_UNAVAILABLE_ERRORS):
             try:
                 client = _get_tts_client()
-                fallback_voice = fallback_voice_map.get(language_code)
                 if fallback_voice:
-                    voice = texttospeech_v1.VoiceSelectionParams(
-                        language_code=language_code,
-                        name=fallback_voice,
-                        ssml_gender=texttospeech_v1.SsmlVoiceGender.NEUTRAL,
-                    )
+                    voice = _voice_params(language_code, fallback_voice)
                     response = client.synthesize_speech(
                         input=synthesis_input,
                         voice=voice,
-                        audio_config=audio_config
+                        audio_config=audio_config,
+                        retry=_TTS_RETRY,
+                        timeout=_TTS_TIMEOUT
                     )
+                    _tts_cache_put(cache_key, response.audio_content)
                     return response.audio_content
             except Exception as fallback_error:
-                print(f"ERROR in text_to_speech fallback: {fallback_error}")
+                logger.error("Error in text_to_speech fallback: %s", fallback_error)
         
         raise
 
 
+def _read_response_body(response: requests.Response) -> bytes:
+    """
+    Read a streamed HTTP response body into a single preallocated buffer.
+    
+    Uses Content-Length to allocate once and fills it with readinto, avoiding
+    repeated reallocation for multi-MB voice notes. Falls back to the decoded
+    content when the length is not advertised or the body is content-encoded.
+    """
+    length = int(response.headers.get("Content-Length") or 0)
+    if not length or response.headers.get("Content-Encoding"):
+        return response.content
+    
+    buf = bytearray(length)
+    view = memoryview(buf)
+    offset = 0
+    while offset < length:
+        n = response.raw.readinto(view[offset:offset + _DOWNLOAD_CHUNK_SIZE])
+        if not n:
+            break
+        offset += n
+    return bytes(view[:offset])
+
+
 def download_line_audio(message_id: str, access_token: str) -> bytes:
     """
     Download audio content from LINE Content API.
@@ -240,17 +526,37 @@ def download_line_audio(message_id: str, access_token: str) -> bytes:
             "Authorization": f"Bearer {access_token}"
         }
         
-        req = urllib.request.Request(url, headers=headers)
-        with urllib.request.urlopen(req) as response:
-            if response.status == 200:
-                return response.read()
+        with _http.get(url, headers=headers, timeout=30, stream=True) as response:
+            response.raise_for_status()
+            if response.status_code == 200:
+                return _read_response_body(response)
             else:
-                raise Exception(f"Failed to download audio: HTTP {response.status}")
+                raise Exception(f"Failed to download audio: HTTP {response.status_code}")
                 
-    except urllib.error.HTTPError as e:
-        print(f"HTTP Error downloading LINE audio: {e.code} {e.reason}")
-        raise Exception(f"Failed to download audio from LINE: {e.code} {e.reason}")
+    except requests.HTTPError as e:
+        status = e.response.status_code if e.response is not None else "?"
+        reason = e.response.reason if e.response is not None else ""
+        logger.error("HTTP error downloading LINE audio: %s %s", status, reason)
+        raise Exception(f"Failed to download audio from LINE: {status} {reason}")
     except Exception as e:
-        print(f"ERROR downloading LINE audio: {e}")
+        logger.error("Error downloading LINE audio: %s", e)
         raise
 
+
+def _prewarm_clients() -> None:
+    """
+    Create the Speech and TTS clients and open their gRPC channels ahead of the first request.
+    
+    Runs on a daemon thread at import so the first webhook doesn't pay for
+    ADC lookup and TCP/TLS channel setup. Failures are logged and left to
+    the lazy getters to surface on real use.
+    """
+    try:
+        for client in (_get_speech_client(), _get_tts_client()):
+            # Force the connection handshake, not just object construction
+            client.transport.grpc_channel.subscribe(lambda _state: None, try_to_connect=True)
+    except Exception as e:
+        logger.warning("Pre-warming Google Cloud audio clients failed: %s", e)
+
+
+threading.Thread(target=_prewarm_clients, name="gcs-audio-prewarm", daemon=True).start()
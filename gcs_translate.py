@@ -1,12 +1,80 @@
-from typing import Optional, Dict, Any
-from google.cloud import translate_v2 as translate
+from typing import TYPE_CHECKING, Optional, Dict, Any, List, Callable, NamedTuple
+from langdetect import DetectorFactory, LangDetectException, detect_langs
+import orjson
+import datetime
+import functools
 import html
+import logging
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 
+if TYPE_CHECKING:
+    from google.auth.transport.requests import AuthorizedSession
 
-_client: Optional[translate.Client] = None
 
+logger = logging.getLogger(__name__)
 
-def _get_client() -> translate.Client:
+# Authorized HTTP session for the Translation v2 REST endpoint (initialized lazily).
+# Requests are posted directly rather than through google.cloud.translate_v2, whose
+# client wrapper adds per-call overhead for what is a one-field JSON payload.
+# google.auth is imported on first use so loading this module stays cheap
+_TRANSLATE_URL = "https://translation.googleapis.com/language/translate/v2"
+_REQUEST_TIMEOUT = 10
+# How long a caller waits on its batched translation: the HTTP timeout plus slack
+# for the batching window and dispatch queue, so a lost result can't hang a worker
+_BATCH_RESULT_TIMEOUT = _REQUEST_TIMEOUT + 5
+_session: Optional["AuthorizedSession"] = None
+_session_lock = threading.Lock()
+
+# Keep-alive connections held open to the Translation API
+_HTTP_POOL_SIZE = 32
+
+# The access token is refreshed in the background this long before it expires,
+# so request threads never block on a metadata-server round trip
+_TOKEN_REFRESH_MARGIN = 300
+_TOKEN_RETRY_DELAY = 30
+
+# Script ranges that identify a language without an API call
+# ASCII-only text is deliberately not classified: English, Indonesian and unaccented
+# Spanish are all plain ASCII, so those messages still go to the API
+# A script only decides the language when it makes up most of the letters and no
+# Latin letters are mixed in; Han-only text may be Japanese kanji, so it goes to the API
+_KANA_RE = re.compile(r"[\u3040-\u30ff]")  # Hiragana + Katakana -> Japanese
+_HAN_RE = re.compile(r"[\u4e00-\u9fff]")  # CJK Unified Ideographs -> Chinese or Japanese
+_HANGUL_RE = re.compile(r"[\uac00-\ud7af]")  # Hangul syllables -> Korean
+_THAI_RE = re.compile(r"[\u0e00-\u0e7f]")  # Thai
+_LATIN_RE = re.compile(r"[A-Za-z]")
+
+
+class TranslationResult(NamedTuple):
+    """Translated text together with the source language the API detected."""
+    translated_text: str
+    detected_source: str
+
+
+# Links are dropped before checking whether a message has anything to translate
+_URL_RE = re.compile(r"https?://\S+")
+
+# Local statistical detection for text the script ranges can't classify
+# Only trusted on reasonably long text with a confident top guess; anything else goes to the API
+DetectorFactory.seed = 0  # Make langdetect deterministic
+_LOCAL_DETECT_MIN_LENGTH = 20
+_LOCAL_DETECT_MIN_PROBABILITY = 0.95
+
+# Configured languages matched on their BCP-47 primary subtag, so any regional
+# variant the API detects (zh-CN/zh-TW, en-GB, ja-JP, ...) counts as the same language
+_PRIMARY_SUBTAG_LANGS = frozenset({"zh", "en", "ja"})
+
+# Messages longer than this are translated without being memoized
+_MAX_CACHED_MESSAGE_LENGTH = 1024
+
+# Individual translate calls on texts longer than this are not memoized
+_MAX_CACHED_CALL_LENGTH = 512
+
+
+def _get_session() -> "AuthorizedSession":
     """
     Always use Application Default Credentials (ADC).
     On Cloud Run, this automatically uses the attached service account.
@@ -15,24 +83,274 @@ def _get_client() -> translate.Client:
     2. Use ADC with impersonation: Requires 'Service Account Token Creator' role
     3. Use your own credentials: If you have Cloud Translation API access
     """
-    global _client
-    if _client is None:
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                try:
+                    import google.auth
+                    from google.auth.transport.requests import AuthorizedSession
+                    from requests.adapters import HTTPAdapter
+                    
+                    # ADC handles everything; the session's pool is sized so concurrent
+                    # event workers and batch dispatches all reuse kept-alive TLS connections
+                    credentials, _ = google.auth.default(scopes=["https://www.googleapis.com/auth/cloud-platform"])
+                    _start_token_refresher(credentials)
+                    session = AuthorizedSession(credentials)
+                    session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=_HTTP_POOL_SIZE))
+                    _session = session
+                except Exception as e:
+                    logger.error("Failed to initialize Google Cloud Translate session: %s", e)
+                    logger.error("Make sure GOOGLE_APPLICATION_CREDENTIALS is set or running on GCP")
+                    raise
+    return _session
+
+
+def _post_translate(
+    texts: List[str],
+    target_language: str,
+    source_language: Optional[str] = None
+) -> List[Dict[str, str]]:
+    """
+    Call the Translation v2 REST endpoint for one or more texts.
+    
+    Args:
+        texts: Texts to translate
+        target_language: Target language code
+        source_language: Source language code, or None to let the API detect it
+    
+    Returns:
+        One dict per text with "translatedText" (and "detectedSourceLanguage"
+        when source_language is None), in input order
+    
+    Raises:
+        requests.HTTPError: If the API returns an error status
+    """
+    payload: Dict[str, Any] = {"q": texts, "target": target_language, "format": "text"}
+    if source_language:
+        payload["source"] = source_language
+    response = _get_session().post(
+        _TRANSLATE_URL,
+        data=orjson.dumps(payload),
+        headers={"Content-Type": "application/json"},
+        timeout=_REQUEST_TIMEOUT
+    )
+    response.raise_for_status()
+    return orjson.loads(response.content)["data"]["translations"]
+
+
+def _start_token_refresher(credentials: Any) -> None:
+    """
+    Fetch an access token now and keep it fresh on a daemon thread.
+    
+    Args:
+        credentials: google.auth credentials shared with the Translate session
+    """
+    from google.auth.transport.requests import Request
+    
+    auth_request = Request()
+    credentials.refresh(auth_request)
+    
+    def refresh_loop() -> None:
+        while True:
+            delay = _TOKEN_RETRY_DELAY
+            if credentials.expiry is not None:
+                # google.auth stores expiry as a naive UTC datetime
+                now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+                remaining = (credentials.expiry - now).total_seconds()
+                delay = max(remaining - _TOKEN_REFRESH_MARGIN, _TOKEN_RETRY_DELAY)
+            time.sleep(delay)
+            try:
+                credentials.refresh(auth_request)
+            except Exception as e:
+                # The session still refreshes on demand if this keeps failing
+                logger.warning("Background Translate token refresh failed: %s", e)
+    
+    threading.Thread(target=refresh_loop, name="gcs-translate-token", daemon=True).start()
+
+
+class _TranslationBatcher:
+    """
+    Coalesces concurrent translate calls into one multi-text request.
+    
+    Callers submit single texts and block on a Future. A background thread
+    collects submissions for up to max_wait seconds (or until a bucket holds
+    max_batch_size texts), groups them by (target, source) language, and sends
+    each group as one translate request (the v2 endpoint accepts a list of texts).
+    """
+    
+    def __init__(self, max_batch_size: int = 64, max_wait: float = 0.01, dispatch_workers: int = 4):
+        self._max_batch_size = max_batch_size
+        self._max_wait = max_wait
+        self._cond = threading.Condition()
+        self._pending: Dict[tuple[str, Optional[str]], List[tuple[str, Future]]] = {}
+        self._dispatch_pool = ThreadPoolExecutor(max_workers=dispatch_workers, thread_name_prefix="translate-batch")
+        self._thread: Optional[threading.Thread] = None
+    
+    def submit(self, text: str, target_language: str, source_language: Optional[str] = None) -> Future:
+        """Queue text for translation; the Future resolves to the API's result dict."""
+        future: Future = Future()
+        with self._cond:
+            self._pending.setdefault((target_language, source_language), []).append((text, future))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="translate-batcher", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return future
+    
+    def _batch_full(self) -> bool:
+        return any(len(items) >= self._max_batch_size for items in self._pending.values())
+    
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                # Give concurrent callers a short window to join the batch
+                deadline = time.monotonic() + self._max_wait
+                while not self._batch_full():
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batches, self._pending = self._pending, {}
+            
+            for (target_language, source_language), items in batches.items():
+                for start in range(0, len(items), self._max_batch_size):
+                    chunk = items[start:start + self._max_batch_size]
+                    self._dispatch_pool.submit(self._dispatch, target_language, source_language, chunk)
+    
+    def _dispatch(self, target_language: str, source_language: Optional[str], items: List[tuple[str, Future]]) -> None:
         try:
-            _client = translate.Client()  # ADC handles everything
+            results = _post_translate([text for text, _ in items], target_language, source_language)
         except Exception as e:
-            print(f"ERROR: Failed to initialize Google Cloud Translate client: {e}")
-            print("Make sure GOOGLE_APPLICATION_CREDENTIALS is set or running on GCP")
-            raise
-    return _client
+            for _, future in items:
+                future.set_exception(e)
+            return
+        if len(results) != len(items):
+            error = Exception(f"Translate API returned {len(results)} translations for {len(items)} texts")
+            for _, future in items:
+                future.set_exception(error)
+            return
+        for (_, future), result in zip(items, results, strict=True):
+            future.set_result(result)
+
+
+_batcher = _TranslationBatcher()
 
 
-def translate_text(text: str, target_language: str) -> str:
-    client = _get_client()
-    # Use format_='text' to avoid HTML encoding, and decode any HTML entities
-    result = client.translate(text, target_language=target_language, format_='text')
+def _unescape(text: str) -> str:
+    """Decode HTML entities in API output, skipping the scan when there are none."""
+    if "&" not in text:
+        return text
+    return html.unescape(text)
+
+
+def translate_text(text: str, target_language: str, source_language: Optional[str] = None) -> str:
+    # Repeated short phrases are served from the in-process memo
+    if len(text) <= _MAX_CACHED_CALL_LENGTH:
+        return _translate_text_cached(text, target_language, source_language)
+    return _translate_text_uncached(text, target_language, source_language)
+
+
+def _translate_text_uncached(text: str, target_language: str, source_language: Optional[str] = None) -> str:
+    # Use format "text" to avoid HTML encoding, and decode any HTML entities
+    # Passing an already-known source_language skips server-side detection
+    # Concurrent calls are coalesced into a single request by the batcher
+    result = _batcher.submit(text, target_language, source_language).result(timeout=_BATCH_RESULT_TIMEOUT)
     translated = result["translatedText"]
     # Decode HTML entities (e.g., &#39; -> ')
-    return html.unescape(translated)
+    return _unescape(translated)
+
+
+def _translate_with_detection(text: str, target_language: str) -> TranslationResult:
+    """Memoized front for _translate_with_detection_uncached (short texts only)."""
+    if len(text) <= _MAX_CACHED_CALL_LENGTH:
+        return _translate_with_detection_cached(text, target_language)
+    return _translate_with_detection_uncached(text, target_language)
+
+
+def _translate_with_detection_uncached(text: str, target_language: str) -> TranslationResult:
+    """
+    Translate text and report the source language the API auto-detected.
+    
+    Omitting source_language makes the translate endpoint return detectedSourceLanguage,
+    so a single request covers both detection and translation.
+    
+    Returns:
+        TranslationResult with the translated text and detected source language code
+    """
+    result = _batcher.submit(text, target_language).result(timeout=_BATCH_RESULT_TIMEOUT)
+    return TranslationResult(_unescape(result["translatedText"]), result["detectedSourceLanguage"])
+
+
+def _has_nothing_to_translate(message: str) -> bool:
+    """True when the message has no letters once links are removed (emoji, numbers, punctuation, URLs)."""
+    residue = _URL_RE.sub("", message) if "://" in message else message
+    return not any(ch.isalpha() for ch in residue)
+
+
+def _quick_detect(message: str) -> Optional[str]:
+    """
+    Detect a message's language locally, without calling the API.
+    
+    Script ranges decide Japanese/Korean/Thai text written mostly in that script;
+    other text of sufficient length is classified by langdetect when it is confident.
+    Mixed-script and Han-only text is left to the API.
+    
+    Returns:
+        Language code (e.g. 'ja', 'zh', 'en', 'id'), or None if detection is uncertain
+    """
+    kana = len(_KANA_RE.findall(message))
+    han = len(_HAN_RE.findall(message))
+    hangul = len(_HANGUL_RE.findall(message))
+    thai = len(_THAI_RE.findall(message))
+    if kana or han or hangul or thai:
+        # A Japanese place name in an English sentence, a katakana word in
+        # romaji, etc. - let the API weigh the whole message
+        if _LATIN_RE.search(message):
+            return None
+        letters = sum(1 for ch in message if ch.isalpha())
+        if kana and (kana + han) * 2 >= letters:
+            return "ja"
+        if hangul * 2 >= letters:
+            return "ko"
+        if thai * 2 >= letters:
+            return "th"
+        # Han without kana is usually Chinese but may be kanji-only Japanese ("大丈夫")
+        return None
+    
+    if len(message) >= _LOCAL_DETECT_MIN_LENGTH:
+        try:
+            best = detect_langs(message)[0]
+        except LangDetectException:
+            return None
+        if best.prob >= _LOCAL_DETECT_MIN_PROBABILITY:
+            # langdetect reports Chinese as zh-cn/zh-tw
+            return "zh" if best.lang.startswith("zh") else best.lang
+    return None
+
+
+def _matches(detected: str, lang_code: str) -> bool:
+    """Check if a detected language code counts as the given configured language."""
+    primary = lang_code.partition("-")[0]
+    if primary in _PRIMARY_SUBTAG_LANGS:
+        return detected.partition("-")[0] == primary
+    return detected == lang_code
+
+
+def _translate_to_single_target(message: str, target: str, hint: Optional[str]) -> str:
+    """Translate message to target unless it is already in that language."""
+    if hint is not None:
+        # Language known locally: skip the API entirely when already in the target
+        if _matches(hint, target):
+            return message
+        return translate_text(message, target)
+    
+    translated, detected_lang = _translate_with_detection(message, target)
+    if _matches(detected_lang, target):
+        return message
+    return translated
 
 
 def detect_and_translate(
@@ -62,58 +380,121 @@ def detect_and_translate(
     if not enabled:
         return message
     
+    # Emoji-only, number-only and link-only messages never need an API call
+    if _has_nothing_to_translate(message):
+        return message
+    
     try:
-        client = _get_client()
-        detection = client.detect_language(message)
-        detected_lang = detection["language"]
-        
-        # American mode: translate any detected language to en-US
-        if mode == "american":
-            if detected_lang == "en" or detected_lang.startswith("en-"):
-                return message  # Already English
-            return translate_text(message, "en-US")
-        
-        # Mandarin mode: translate any detected language to zh-TW
-        if mode == "mandarin":
-            if detected_lang in {"zh", "zh-CN", "zh-TW"}:
-                return message  # Already Traditional Chinese
-            return translate_text(message, "zh-TW")
-        
-        # Japanese mode: translate any detected language to ja
-        if mode == "japanese":
-            if detected_lang == "ja" or detected_lang.startswith("ja-"):
-                return message  # Already Japanese
-            return translate_text(message, "ja")
-        
-        # Pair mode: bidirectional translation (source ↔ target)
-        if mode == "pair" and source_lang and target_lang:
-            # Helper function to check if detected language matches a given language code
-            def matches_lang(detected: str, lang_code: str) -> bool:
-                """Check if detected language matches the given language code."""
-                if lang_code == "zh-TW":
-                    # Handle Chinese variants
-                    return detected in {"zh", "zh-CN", "zh-TW"}
-                return detected == lang_code
-            
-            # Translate source → target
-            if matches_lang(detected_lang, source_lang):
-                return translate_text(message, target_lang)
-            
-            # Translate target → source (bidirectional)
-            if matches_lang(detected_lang, target_lang):
-                return translate_text(message, source_lang)
-            
-            # Neither source nor target detected, don't translate
-            return message
-        
-        # Default behavior if no specific settings: detect and translate to English
-        if detected_lang in {"zh", "zh-CN", "zh-TW"}:
-            return translate_text(message, "en")
-        if detected_lang == "en":
-            return translate_text(message, "zh-TW")
-        
-        return message  # No translation if language not supported
+        # Recurring phrases are served from the memo without another API call
+        if len(message) <= _MAX_CACHED_MESSAGE_LENGTH:
+            return _detect_and_translate_cached(message, source_lang, target_lang, mode)
+        return _detect_and_translate_uncached(message, source_lang, target_lang, mode)
     except Exception as e:
-        print(f"ERROR in detect_and_translate: {e}")
+        logger.error("Error in detect_and_translate: %s", e)
         # Return original message if translation fails
-        return message
\ No newline at end of file
+        return message
+
+
+def _handle_american(message: str, hint: Optional[str], _source_lang: Optional[str], _target_lang: Optional[str]) -> str:
+    """American mode: translate any detected language to en-US."""
+    return _translate_to_single_target(message, "en-US", hint)
+
+
+def _handle_mandarin(message: str, hint: Optional[str], _source_lang: Optional[str], _target_lang: Optional[str]) -> str:
+    """Mandarin mode: translate any detected language to zh-TW."""
+    return _translate_to_single_target(message, "zh-TW", hint)
+
+
+def _handle_japanese(message: str, hint: Optional[str], _source_lang: Optional[str], _target_lang: Optional[str]) -> str:
+    """Japanese mode: translate any detected language to ja."""
+    return _translate_to_single_target(message, "ja", hint)
+
+
+def _handle_pair(message: str, hint: Optional[str], source_lang: Optional[str], target_lang: Optional[str]) -> str:
+    """Pair mode: bidirectional translation (source ↔ target)."""
+    if not (source_lang and target_lang):
+        return _handle_default(message, hint, source_lang, target_lang)
+    
+    if hint is not None:
+        # Direction known locally: one translate call, no detection needed
+        if _matches(hint, source_lang):
+            return translate_text(message, target_lang)
+        if _matches(hint, target_lang):
+            return translate_text(message, source_lang)
+        return message
+    
+    # Optimistically translate source → target; the response also carries the detection
+    translated, detected_lang = _translate_with_detection(message, target_lang)
+    if _matches(detected_lang, source_lang):
+        return translated
+    
+    # Translate target → source (bidirectional); the language is already known
+    if _matches(detected_lang, target_lang):
+        return translate_text(message, source_lang, source_language=detected_lang)
+    
+    # Neither source nor target detected, don't translate
+    return message
+
+
+def _handle_default(message: str, hint: Optional[str], _source_lang: Optional[str], _target_lang: Optional[str]) -> str:
+    """Default behavior if no specific settings: Chinese → English, English → Chinese."""
+    if hint == "zh":
+        return translate_text(message, "en")
+    if hint == "en":
+        return translate_text(message, "zh-TW", source_language="en")
+    if hint is not None:
+        return message  # Detected locally as a language this mode doesn't translate
+    translated, detected_lang = _translate_with_detection(message, "en")
+    primary = detected_lang.partition("-")[0]
+    if primary == "zh":
+        return translated
+    if primary == "en":
+        return translate_text(message, "zh-TW", source_language="en")
+    
+    return message  # No translation if language not supported
+
+
+# Translation mode -> handler; unknown modes fall back to _handle_default
+_MODE_HANDLERS: Dict[str, Callable[[str, Optional[str], Optional[str], Optional[str]], str]] = {
+    "american": _handle_american,
+    "mandarin": _handle_mandarin,
+    "japanese": _handle_japanese,
+    "pair": _handle_pair,
+}
+
+
+def _detect_and_translate_uncached(
+    message: str,
+    source_lang: Optional[str],
+    target_lang: Optional[str],
+    mode: str
+) -> str:
+    """Detect and translate message; raises on API failure so errors are never memoized."""
+    hint = _quick_detect(message)
+    handler = _MODE_HANDLERS.get(mode, _handle_default)
+    return handler(message, hint, source_lang, target_lang)
+
+
+# Results depend only on the arguments, so identical requests share one API call
+# API errors propagate and are never cached
+_translate_text_cached = functools.lru_cache(maxsize=4096)(_translate_text_uncached)
+_translate_with_detection_cached = functools.lru_cache(maxsize=4096)(_translate_with_detection_uncached)
+_detect_and_translate_cached = functools.lru_cache(maxsize=4096)(_detect_and_translate_uncached)
+
+
+def _prewarm_session() -> None:
+    """
+    Create the Translate session and local detector ahead of the first request.
+    
+    Runs on a daemon thread at import so the first webhook doesn't pay for
+    ADC lookup. Failures are logged and left to _get_session to surface on real use.
+    """
+    try:
+        _get_session()
+        # Load langdetect's language profiles now rather than on the first message
+        detect_langs("warm up the local language detector")
+    except Exception as e:
+        logger.warning("Pre-warming Google Cloud Translate session failed: %s", e)
+
+
+threading.Thread(target=_prewarm_session, name="gcs-translate-prewarm", daemon=True).start()
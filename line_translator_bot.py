@@ -16,20 +16,79 @@ from linebot.v3.webhooks import (
     GroupSource
 )
 from dotenv import load_dotenv
+import atexit
 import os
-import traceback
-import json
-import urllib.request
-import urllib.error
+import logging
+import logging.handlers
+import queue
+import time
+import orjson
+import requests
+from requests.adapters import HTTPAdapter
 import re
-from typing import Dict, Any, Optional, cast
+import functools
+import threading
+from collections import OrderedDict
+from types import MappingProxyType
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Any, List, Mapping, Optional, cast
+from google.api_core import retry as retries
 from google.cloud.firestore_v1 import Client
 from google.cloud.firestore_v1.base_document import DocumentSnapshot
+from google.cloud.firestore_v1.base_query import FieldFilter
 
 from gcs_translate import detect_and_translate
-from gcs_audio import speech_to_text, download_line_audio
+from gcs_audio import recognize_speech, stage_recognition_audio, download_line_audio
 
 load_dotenv()
+
+
+class _DuplicateLogFilter(logging.Filter):
+    """
+    Drop repeats of the same log message within a short window.
+    
+    Keeps an error storm (e.g. a LINE API outage) from turning log formatting
+    and writes into the bottleneck; the first occurrence is always emitted.
+    Records are compared by their formatted message (and exception type), so
+    distinct events that share a format string are all kept.
+    """
+    
+    def __init__(self, window: float = 1.0):
+        super().__init__()
+        self._window = window
+        self._last_seen: Dict[tuple[str, int, str, Any], float] = {}
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        exc_type = record.exc_info[0] if record.exc_info else None
+        key = (record.name, record.levelno, record.getMessage(), exc_type)
+        now = time.monotonic()
+        last = self._last_seen.get(key)
+        if last is not None and now - last < self._window:
+            return False
+        if len(self._last_seen) > 1024:
+            self._last_seen.clear()
+        self._last_seen[key] = now
+        return True
+
+
+# Request threads render the message (and any traceback) into the record and enqueue
+# it; a background listener thread applies the final layout and does the blocking
+# write to stderr
+_log_handler = logging.StreamHandler()
+_log_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+_log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+_log_queue_handler = logging.handlers.QueueHandler(_log_queue)
+_log_queue_handler.setFormatter(logging.Formatter("%(message)s"))  # Final layout is applied by _log_handler
+_log_queue_handler.addFilter(_DuplicateLogFilter())
+_log_listener = logging.handlers.QueueListener(_log_queue, _log_handler)
+_log_listener.start()
+atexit.register(_log_listener.stop)
+logging.basicConfig(
+    level=os.getenv('LOG_LEVEL', 'INFO').upper(),
+    handlers=[_log_queue_handler],
+)
+logger = logging.getLogger(__name__)
+
 CHANNEL_ACCESS_TOKEN = os.getenv('LINE_CHANNEL_ACCESS_TOKEN')
 CHANNEL_SECRET = os.getenv('LINE_CHANNEL_SECRET')
 APP_VERSION = os.getenv('APP_VERSION', 'unknown')
@@ -38,19 +97,112 @@ app = Flask(__name__)
 
 # Initialize LINE Bot API
 if not CHANNEL_ACCESS_TOKEN or not CHANNEL_SECRET:
-    print("ERROR: LINE_CHANNEL_ACCESS_TOKEN or LINE_CHANNEL_SECRET not set!")
-    print("Please set these environment variables in your .env file")
+    logger.error("LINE_CHANNEL_ACCESS_TOKEN or LINE_CHANNEL_SECRET not set!")
+    logger.error("Please set these environment variables in your .env file")
     raise ValueError("LINE credentials not configured")
 
 configuration = Configuration(access_token=CHANNEL_ACCESS_TOKEN)
 handler = WebhookHandler(CHANNEL_SECRET)
 
+# Shared LINE Messaging API client - its urllib3 pool is thread-safe, so every
+# reply reuses kept-alive TLS connections instead of opening a new one
+_api_client = ApiClient(configuration)
+_line_bot_api = MessagingApi(_api_client)
+atexit.register(_api_client.close)
+
+# Keep-alive session for LINE profile lookups, so a display-name fetch doesn't
+# pay a fresh TCP+TLS handshake to api.line.me on every translated message
+_line_http = requests.Session()
+_line_http.headers.update({"Authorization": f"Bearer {CHANNEL_ACCESS_TOKEN}"})
+_line_http.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=32))
+
+# Display names rarely change, so lookups are cached per (user, group). Profiles the
+# API says are unavailable (403/404) are cached briefly so a user who blocked the
+# bot doesn't trigger a failing request on every message; transient errors aren't cached
+_DISPLAY_NAME_TTL = 900
+_DISPLAY_NAME_MISSING_TTL = 60
+_DISPLAY_NAME_CACHE_MAX_ENTRIES = 10_000
+_display_name_cache: "OrderedDict[tuple[str, Optional[str]], tuple[float, Optional[str]]]" = OrderedDict()
+_display_name_cache_lock = threading.Lock()
+
+# Events are handled on this pool after the webhook has already answered LINE, so
+# a slow translate/reply never holds up the next delivery. At most EVENT_QUEUE_LIMIT
+# events may be queued or running; beyond that new events are dropped, since their
+# reply tokens would likely expire before a worker got to them
+_EVENT_WORKERS = int(os.getenv('EVENT_WORKERS', '8'))
+_EVENT_QUEUE_LIMIT = int(os.getenv('EVENT_QUEUE_LIMIT', '64'))
+_event_executor = ThreadPoolExecutor(max_workers=_EVENT_WORKERS, thread_name_prefix="line-event")
+_event_slots = threading.BoundedSemaphore(_EVENT_QUEUE_LIMIT)
+_events_pending = 0  # Queued or running events, reported in logs as the queue depth
+_events_pending_lock = threading.Lock()
+
+# Side lookups (LINE profile) that overlap with an event's translate call
+_io_executor = ThreadPoolExecutor(max_workers=_EVENT_WORKERS, thread_name_prefix="line-io")
+atexit.register(_io_executor.shutdown, wait=False)
+
+# IDs of recently handled messages; LINE redelivers a webhook it thinks failed,
+# and the same message must not be translated and replied to twice
+_SEEN_MESSAGE_IDS_MAX = 10_000
+_seen_message_ids: "OrderedDict[str, None]" = OrderedDict()
+_seen_message_ids_lock = threading.Lock()
+
 # Firestore client (initialized lazily)
 # Each LINE user has their own isolated settings stored as a separate document
 # Document ID = user_id, ensuring complete data isolation between users
 _db_client: Optional[Client] = None
+_db_client_lock = threading.Lock()
 _COLLECTION_NAME = "user_settings"
 
+# Transient Firestore errors (unavailable, deadline exceeded, ...) are retried with
+# exponential backoff instead of surfacing as a failed command; merge writes are
+# idempotent, so retrying them is safe
+_FIRESTORE_RETRY = retries.Retry(
+    predicate=retries.if_transient_error,
+    initial=0.1,
+    maximum=2.0,
+    multiplier=2.0,
+    timeout=10.0,
+)
+
+# Settings for a user or group that has never configured anything (read-only; copy before use)
+_DEFAULT_SETTINGS: Mapping[str, Any] = MappingProxyType({
+    "enabled": False,
+    "mode": "pair",
+    "source_lang": None,
+    "target_lang": None
+})
+
+# Only these fields are fetched when reading a settings document
+_SETTINGS_FIELDS = list(_DEFAULT_SETTINGS)
+
+# Recently read settings documents, keyed by Firestore document ID, so ordinary
+# messages in an active chat don't pay a Firestore round trip each time.
+# Writes from this instance update the cache directly; changes made through
+# another instance become visible once the entry expires
+_SETTINGS_CACHE_TTL = 60
+_SETTINGS_CACHE_MAX_ENTRIES = 10_000
+_settings_cache: "OrderedDict[str, tuple[float, Dict[str, Any]]]" = OrderedDict()
+_settings_cache_lock = threading.Lock()
+
+# Per-document count of local writes, guarded by _settings_cache_lock. A read
+# records it before going to Firestore and only caches its result if no write
+# landed meanwhile, so a slow read can't put pre-write settings back in the cache
+_settings_generation: Dict[str, int] = {}
+
+# Firestore reads in progress, keyed by document ID; concurrent cache misses for the
+# same chat wait on the first caller's read instead of issuing their own
+_settings_inflight: Dict[str, Future] = {}
+_settings_inflight_lock = threading.Lock()
+
+# Document IDs of chats with translation enabled, mirrored from Firestore by a
+# snapshot listener. Text messages from any other chat are dropped without a
+# settings read; until the first snapshot arrives (and whenever the listener has
+# stopped and is being re-subscribed) every message takes the normal path
+_enabled_chat_ids: set[str] = set()
+_enabled_chat_ids_lock = threading.Lock()
+_enabled_chat_ids_ready = threading.Event()
+_ENABLED_CHATS_WATCH_CHECK_INTERVAL = 10  # Seconds between listener liveness checks
+
 # Common languages for american mode (prioritized list)
 # Google Cloud Speech-to-Text language codes for multi-language recognition
 # These are used when mode is "american" to detect any language and translate to English
@@ -79,19 +231,325 @@ AMERICAN_MODE_LANGUAGES = [
 ]
 
 
+def _stt_language_groups(mode_lang: str) -> tuple:
+    """
+    Build the (primary, alternatives) recognition attempts for a translate-anything mode.
+    
+    Speech-to-Text accepts at most 4 alternative languages per request, so the
+    language list is split into groups; the mode's own language leads the first one.
+    
+    Args:
+        mode_lang: Speech-to-Text code of the mode's language (e.g., 'en-US', 'zh-TW', 'ja-JP')
+    
+    Returns:
+        Tuple of (primary, alternatives) pairs in priority order
+    """
+    languages = AMERICAN_MODE_LANGUAGES
+    if mode_lang == languages[0]:
+        # The list already leads with this language, so plain groups of 5 suffice
+        return tuple(
+            (languages[start], tuple(languages[start + 1:start + 5]))
+            for start in range(0, len(languages), 5)
+        )
+    
+    first_alternatives = [lang for lang in languages[:4] if lang != mode_lang][:4]
+    if len(first_alternatives) < 4:
+        first_alternatives.extend([lang for lang in languages[4:] if lang != mode_lang][:4 - len(first_alternatives)])
+    groups = [(mode_lang, tuple(first_alternatives))]
+    for start in range(0, len(languages), 5):
+        group_languages = languages[start:start + 5]
+        # Skip a group led by the mode's language (already tried first)
+        if group_languages[0] == mode_lang:
+            continue
+        alternatives = [lang for lang in group_languages[1:5] if lang != mode_lang]
+        if len(alternatives) < 4:
+            alternatives.extend([lang for lang in languages if lang not in alternatives and lang != mode_lang][:4 - len(alternatives)])
+        groups.append((group_languages[0], tuple(alternatives)))
+    return tuple(groups)
+
+
+# Recognition attempts for each translate-anything mode, built once at import
+_STT_MODE_GROUPS = {
+    "american": _stt_language_groups("en-US"),
+    "mandarin": _stt_language_groups("zh-TW"),
+    "japanese": _stt_language_groups("ja-JP"),
+}
+
+# Translate-anything voice modes: mode -> (translation target, language name used in replies)
+_VOICE_MODE_TARGETS = {
+    "american": ("en-US", "English"),
+    "mandarin": ("zh-TW", "Traditional Chinese"),
+    "japanese": ("ja", "Japanese"),
+}
+
+# Canned voice-message replies; static text is built once here rather than per event
+_VOICE_NOT_ENABLED_REPLIES = {
+    mode: (
+        "Voice translation is not enabled.\n"
+        "Please enable translation using:\n"
+        f"/set {mode}"
+    )
+    for mode in _VOICE_MODE_TARGETS
+}
+_VOICE_PAIR_REQUIRED_REPLY = (
+    "Voice translation requires a language pair to be set.\n"
+    "Please set a language pair using:\n"
+    "/set language pair <source> <target>\n\n"
+    "Or use American mode:\n"
+    "/set american\n\n"
+    "Or use Mandarin mode:\n"
+    "/set mandarin\n\n"
+    "Or use Japanese mode:\n"
+    "/set japanese\n\n"
+    "Supported languages for pair mode: en, zh-TW, es, ja, th, id"
+)
+_SPEECH_NOT_RECOGNIZED_REPLY = (
+    "Could not recognize speech. Please ensure:\n"
+    "- Audio is clear and not too quiet\n"
+    "- You're speaking in a supported language\n"
+    "- Try speaking more slowly or clearly\n\n"
+    "Note: Only languages supported by Google Cloud Speech-to-Text can be recognized."
+)
+
+# Map lowercase /set language pair inputs to proper Google Cloud format
+_LANGUAGE_CODE_MAP = {
+    "en": "en",
+    "zh-tw": "zh-TW",
+    "zh-cn": "zh-TW",  # Map zh-cn to zh-TW (we only support Traditional Chinese)
+    "es": "es",
+    "ja": "ja",
+    "jpn": "ja",  # Also accept jpn
+    "th": "th",
+    "id": "id",
+    "ind": "id"  # Also accept ind
+}
+# Canonical codes map to themselves, so already-normalized input skips .lower()
+_LANGUAGE_CODE_MAP.update({code: code for code in set(_LANGUAGE_CODE_MAP.values())})
+
+# Supported Google Cloud language codes for pair mode (proper format)
+_SUPPORTED_LANGUAGES = ("en", "zh-TW", "es", "ja", "th", "id")
+_SUPPORTED_LANGUAGE_CODES = frozenset(_SUPPORTED_LANGUAGES)
+_SUPPORTED_LANGUAGES_TEXT = ", ".join(_SUPPORTED_LANGUAGES)
+
+# Map translation language codes to Speech-to-Text language codes
+# Google Cloud Speech-to-Text uses specific locale codes
+_STT_LANGUAGE_MAP = {
+    "en": "en-US",
+    "zh-TW": "zh-TW",
+    "es": "es-ES",  # Spanish (Spain), can also use es-MX for Mexico
+    "ja": "ja-JP",
+    "th": "th-TH",
+    "id": "id-ID"
+}
+
+# Language names used in voice recognition error messages
+_LANGUAGE_NAMES = {
+    "en": "English",
+    "zh-TW": "Traditional Chinese",
+    "es": "Spanish",
+    "ja": "Japanese",
+    "th": "Thai",
+    "id": "Indonesian"
+}
+
+
 def _get_db() -> Client:
     """Get Firestore client, initializing if needed."""
     global _db_client
     if _db_client is None:
+        with _db_client_lock:
+            if _db_client is None:
+                try:
+                    # Use the specific database ID if provided, otherwise use default
+                    database_id = os.getenv('FIRESTORE_DATABASE_ID', 'line-trnsltrbt-db')
+                    _db_client = Client(database=database_id)
+                except Exception as e:
+                    logger.error("Error initializing Firestore client: %s", e)
+                    logger.error("Make sure the service account has Firestore permissions")
+                    raise
+    return _db_client
+
+
+def _prewarm_firestore() -> None:
+    """
+    Open the Firestore channel and fetch credentials ahead of the first webhook.
+    
+    Runs on a daemon thread at startup; one read of a placeholder document pays
+    the gRPC connection and auth-token cost. Failures are logged and left to
+    _get_db to surface on real use. The enabled-chats listener is started either
+    way, since it retries on its own until Firestore is reachable.
+    """
+    try:
+        # Document IDs matching __.*__ are reserved by Firestore, so use a plain ID
+        _get_db().collection(_COLLECTION_NAME).document("warmup").get()
+    except Exception as e:
+        logger.warning("Pre-warming Firestore client failed: %s", e)
+    
+    threading.Thread(target=_watch_enabled_chats, name="enabled-chats-watch", daemon=True).start()
+
+
+def _watch_enabled_chats() -> None:
+    """
+    Keep _enabled_chat_ids in sync with the settings documents that have enabled == True.
+    
+    Runs for the life of the process on its own daemon thread. When the listener's
+    stream closes (error, network loss), the set is marked not ready, so messages
+    fall back to the settings read, and a new listener rebuilds it from a fresh
+    initial snapshot.
+    """
+    def on_snapshot(_docs, changes, _read_time) -> None:
+        with _enabled_chat_ids_lock:
+            for change in changes:
+                # REMOVED means the document no longer matches, i.e. translation was disabled
+                if change.type.name == "REMOVED":
+                    _enabled_chat_ids.discard(change.document.id)
+                else:
+                    _enabled_chat_ids.add(change.document.id)
+        _enabled_chat_ids_ready.set()
+    
+    while True:
         try:
-            # Use the specific database ID if provided, otherwise use default
-            database_id = os.getenv('FIRESTORE_DATABASE_ID', 'line-trnsltrbt-db')
-            _db_client = Client(database=database_id)
+            # The first snapshot of a new listener lists every enabled chat again
+            with _enabled_chat_ids_lock:
+                _enabled_chat_ids.clear()
+            query = _get_db().collection(_COLLECTION_NAME).where(filter=FieldFilter("enabled", "==", True))
+            watch = query.on_snapshot(on_snapshot)
         except Exception as e:
-            print(f"ERROR initializing Firestore client: {e}")
-            print("Make sure the service account has Firestore permissions")
-            raise
-    return _db_client
+            logger.warning("Could not start the enabled-chats listener: %s", e)
+            time.sleep(_ENABLED_CHATS_WATCH_CHECK_INTERVAL)
+            continue
+        
+        while watch.is_active:
+            time.sleep(_ENABLED_CHATS_WATCH_CHECK_INTERVAL)
+        
+        logger.warning("Enabled-chats listener stopped; re-subscribing")
+        _enabled_chat_ids_ready.clear()
+        try:
+            watch.unsubscribe()
+        except Exception:
+            pass
+
+
+def _enabled_chats_apply(doc_id: str, updates: Dict[str, Any]) -> None:
+    """Reflect a local enabled/disabled write immediately, ahead of the listener."""
+    if "enabled" not in updates:
+        return
+    with _enabled_chat_ids_lock:
+        if updates["enabled"]:
+            _enabled_chat_ids.add(doc_id)
+        else:
+            _enabled_chat_ids.discard(doc_id)
+
+
+def is_translation_known_disabled(doc_id: str) -> bool:
+    """
+    Check whether a chat is known to have translation off without reading its settings.
+    
+    Args:
+        doc_id: Settings document ID (user_id or "group:{group_id}")
+    
+    Returns:
+        True only once the enabled-chats listener is live and doc_id is not in it
+    """
+    if not _enabled_chat_ids_ready.is_set():
+        return False
+    with _enabled_chat_ids_lock:
+        return doc_id not in _enabled_chat_ids
+
+
+threading.Thread(target=_prewarm_firestore, name="firestore-prewarm", daemon=True).start()
+
+
+def _settings_cache_get(doc_id: str) -> Optional[Dict[str, Any]]:
+    """Return a copy of the cached settings for doc_id, or None if missing or expired."""
+    with _settings_cache_lock:
+        entry = _settings_cache.get(doc_id)
+        if entry is None:
+            return None
+        expires_at, settings = entry
+        if expires_at <= time.monotonic():
+            del _settings_cache[doc_id]
+            return None
+        _settings_cache.move_to_end(doc_id)
+        return dict(settings)
+
+
+def _settings_cache_generation(doc_id: str) -> int:
+    """Return the number of local writes seen for doc_id, to pass to _settings_cache_put."""
+    with _settings_cache_lock:
+        return _settings_generation.get(doc_id, 0)
+
+
+def _settings_cache_put(doc_id: str, settings: Dict[str, Any], generation: int) -> None:
+    """
+    Cache a copy of settings for doc_id, evicting the least recently used entry when full.
+    
+    Args:
+        doc_id: Firestore document ID
+        settings: Settings dictionary to cache
+        generation: Value of _settings_cache_generation taken before settings were read;
+            the entry is not cached if a write for doc_id happened since
+    """
+    with _settings_cache_lock:
+        if _settings_generation.get(doc_id, 0) != generation:
+            return
+        _settings_cache[doc_id] = (time.monotonic() + _SETTINGS_CACHE_TTL, dict(settings))
+        _settings_cache.move_to_end(doc_id)
+        if len(_settings_cache) > _SETTINGS_CACHE_MAX_ENTRIES:
+            _settings_cache.popitem(last=False)
+
+
+def _settings_cache_apply(doc_id: str, updates: Dict[str, Any]) -> None:
+    """Merge a successful write into the cached entry, or drop it if there is none to merge into."""
+    with _settings_cache_lock:
+        _settings_generation[doc_id] = _settings_generation.get(doc_id, 0) + 1
+        entry = _settings_cache.get(doc_id)
+        if entry is None:
+            return
+        expires_at, settings = entry
+        merged = dict(settings)
+        merged.update(updates)
+        _settings_cache[doc_id] = (expires_at, merged)
+
+
+def _settings_cache_invalidate(doc_id: str) -> None:
+    """Forget any cached settings for doc_id."""
+    with _settings_cache_lock:
+        _settings_generation[doc_id] = _settings_generation.get(doc_id, 0) + 1
+        _settings_cache.pop(doc_id, None)
+
+
+def _load_settings_once(doc_id: str, read: Callable[[str], Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Read a settings document, sharing one Firestore read among concurrent callers.
+    
+    Args:
+        doc_id: Firestore document ID
+        read: Function performing the actual read for doc_id
+    
+    Returns:
+        Settings dictionary (each caller gets its own copy)
+    """
+    with _settings_inflight_lock:
+        future = _settings_inflight.get(doc_id)
+        leader = future is None
+        if leader:
+            future = Future()
+            _settings_inflight[doc_id] = future
+    
+    if not leader:
+        return dict(future.result())
+    
+    try:
+        settings = read(doc_id)
+        future.set_result(settings)
+        return dict(settings)
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _settings_inflight_lock:
+            _settings_inflight.pop(doc_id, None)
 
 
 def get_user_setting(user_id: str) -> Dict[str, Any]:
@@ -107,42 +565,37 @@ def get_user_setting(user_id: str) -> Dict[str, Any]:
     Returns:
         User settings dictionary with defaults if not found
     """
+    cached = _settings_cache_get(user_id)
+    if cached is not None:
+        return cached
+    return _load_settings_once(user_id, _read_user_setting)
+
+
+def _read_user_setting(user_id: str) -> Dict[str, Any]:
+    """Read user settings from Firestore, returning defaults if not found or on error."""
+    generation = _settings_cache_generation(user_id)
     try:
         db = _get_db()
         # Each user_id gets its own document - complete isolation
         doc_ref = db.collection(_COLLECTION_NAME).document(user_id)
         # Synchronous API - get() returns DocumentSnapshot directly (not awaitable)
         # Type cast needed because type checker incorrectly infers Awaitable
-        doc = cast(DocumentSnapshot, doc_ref.get())
+        doc = cast(DocumentSnapshot, doc_ref.get(field_paths=_SETTINGS_FIELDS, retry=_FIRESTORE_RETRY))
         
         if doc.exists:
             data = doc.to_dict()
             # Ensure all fields are present
-            default_settings = {
-                "enabled": False,
-                "mode": "pair",
-                "source_lang": None,
-                "target_lang": None
-            }
+            default_settings = dict(_DEFAULT_SETTINGS)
             default_settings.update(data or {})
-            return default_settings
         else:
             # Return defaults for new users
-            return {
-                "enabled": False,
-                "mode": "pair",
-                "source_lang": None,
-                "target_lang": None
-            }
+            default_settings = dict(_DEFAULT_SETTINGS)
+        _settings_cache_put(user_id, default_settings, generation)
+        return default_settings
     except Exception as e:
-        print(f"ERROR loading user settings from Firestore: {e}")
+        logger.error("Error loading user settings from Firestore: %s", e)
         # Return defaults on error
-        return {
-            "enabled": False,
-            "mode": "pair",
-            "source_lang": None,
-            "target_lang": None
-        }
+        return dict(_DEFAULT_SETTINGS)
 
 
 def update_user_setting(user_id: str, updates: Dict[str, Any]) -> None:
@@ -160,14 +613,14 @@ def update_user_setting(user_id: str, updates: Dict[str, Any]) -> None:
         # Isolated document per user - updates only affect this user
         doc_ref = db.collection(_COLLECTION_NAME).document(user_id)
         
-        # Get current settings or use defaults
-        current = get_user_setting(user_id)
-        current.update(updates)
-        
-        # Save to Firestore
-        doc_ref.set(current)
+        # Firestore merges the fields server-side, so no read is needed first;
+        # missing fields are filled with defaults when the settings are loaded
+        doc_ref.set(updates, merge=True, retry=_FIRESTORE_RETRY)
+        _settings_cache_apply(user_id, updates)
+        _enabled_chats_apply(user_id, updates)
     except Exception as e:
-        print(f"ERROR saving user settings to Firestore: {e}")
+        _settings_cache_invalidate(user_id)
+        logger.error("Error saving user settings to Firestore: %s", e)
         raise
 
 
@@ -181,38 +634,33 @@ def get_group_setting(group_id: str) -> Dict[str, Any]:
     Returns:
         Group settings dictionary with defaults if not found
     """
+    # Use "group:{group_id}" as document ID to distinguish from user settings
+    doc_id = f"group:{group_id}"
+    cached = _settings_cache_get(doc_id)
+    if cached is not None:
+        return cached
+    return _load_settings_once(doc_id, _read_group_setting)
+
+
+def _read_group_setting(doc_id: str) -> Dict[str, Any]:
+    """Read group settings from Firestore by document ID, returning defaults if not found or on error."""
+    generation = _settings_cache_generation(doc_id)
     try:
         db = _get_db()
-        # Use "group:{group_id}" as document ID to distinguish from user settings
-        doc_id = f"group:{group_id}"
         doc_ref = db.collection(_COLLECTION_NAME).document(doc_id)
-        doc = cast(DocumentSnapshot, doc_ref.get())
+        doc = cast(DocumentSnapshot, doc_ref.get(field_paths=_SETTINGS_FIELDS, retry=_FIRESTORE_RETRY))
         
         if doc.exists:
             data = doc.to_dict()
-            default_settings = {
-                "enabled": False,
-                "mode": "pair",
-                "source_lang": None,
-                "target_lang": None
-            }
+            default_settings = dict(_DEFAULT_SETTINGS)
             default_settings.update(data or {})
-            return default_settings
         else:
-            return {
-                "enabled": False,
-                "mode": "pair",
-                "source_lang": None,
-                "target_lang": None
-            }
+            default_settings = dict(_DEFAULT_SETTINGS)
+        _settings_cache_put(doc_id, default_settings, generation)
+        return default_settings
     except Exception as e:
-        print(f"ERROR loading group settings from Firestore: {e}")
-        return {
-            "enabled": False,
-            "mode": "pair",
-            "source_lang": None,
-            "target_lang": None
-        }
+        logger.error("Error loading group settings from Firestore: %s", e)
+        return dict(_DEFAULT_SETTINGS)
 
 
 def update_group_setting(group_id: str, updates: Dict[str, Any]) -> None:
@@ -223,64 +671,63 @@ def update_group_setting(group_id: str, updates: Dict[str, Any]) -> None:
         group_id: Unique LINE group ID
         updates: Dictionary of settings to update
     """
+    doc_id = f"group:{group_id}"
     try:
         db = _get_db()
-        doc_id = f"group:{group_id}"
         doc_ref = db.collection(_COLLECTION_NAME).document(doc_id)
         
-        # Get current settings or use defaults
-        current = get_group_setting(group_id)
-        current.update(updates)
-        
-        # Save to Firestore
-        doc_ref.set(current)
+        # Merge server-side instead of reading the document first
+        doc_ref.set(updates, merge=True, retry=_FIRESTORE_RETRY)
+        _settings_cache_apply(doc_id, updates)
+        _enabled_chats_apply(doc_id, updates)
     except Exception as e:
-        print(f"ERROR saving group settings to Firestore: {e}")
+        _settings_cache_invalidate(doc_id)
+        logger.error("Error saving group settings to Firestore: %s", e)
         raise
 
 
-def parse_switch_command(message: str) -> Optional[Dict[str, Any]]:
+def _parse_set_pair(parts: List[str]) -> Optional[Dict[str, Any]]:
+    """Build the /set language pair <source> <target> command, or None if arguments are missing."""
+    if len(parts) < 5:
+        return None
+    return {"type": "set_pair", "source": parts[3], "target": parts[4]}
+
+
+# Switch commands keyed by their leading (lower-cased) tokens; each entry builds the
+# command info from the full token list. Longer keys take precedence over shorter ones
+_COMMAND_TABLE: Dict[tuple, Callable[[List[str]], Optional[Dict[str, Any]]]] = {
+    ("/set", "on"): lambda _parts: {"type": "set_on"},
+    ("/set", "off"): lambda _parts: {"type": "set_off"},
+    ("/set", "language", "pair"): _parse_set_pair,
+    ("/set", "american"): lambda _parts: {"type": "set_american"},
+    ("/set", "mandarin"): lambda _parts: {"type": "set_mandarin"},
+    ("/set", "japanese"): lambda _parts: {"type": "set_japanese"},
+    ("/status", "version"): lambda _parts: {"type": "status_version"},
+    ("/status", "help"): lambda _parts: {"type": "status_help"},
+    ("/status",): lambda _parts: {"type": "status"},
+}
+_COMMAND_KEY_LENGTHS = sorted({len(key) for key in _COMMAND_TABLE}, reverse=True)
+
+
+def parse_switch_command(message: str) -> Optional[Mapping[str, Any]]:
     """Parse switch command from message. Returns command info or None if not a command."""
-    message = message.strip()
-    if not message.startswith('/'):
+    # Ordinary chat messages never start with '/', so they skip all parsing
+    # (lstrip() returns the same string when there is no leading whitespace)
+    if not message.lstrip().startswith('/'):
         return None
-    
+    return _parse_command_text(message)
+
+
+@functools.lru_cache(maxsize=1024)
+def _parse_command_text(message: str) -> Optional[Mapping[str, Any]]:
+    """Parse a '/'-prefixed message; results are cached, so they are returned read-only."""
+    # split() already drops surrounding whitespace, so no separate strip() pass
     parts = message.lower().split()
-    if len(parts) == 0:
-        return None
-    
-    command = parts[0]
-    
-    # /set commands - check these first before other /set commands
-    if command == '/set' and len(parts) >= 2:
-        # /set on
-        if parts[1] == 'on':
-            return {"type": "set_on"}
-        # /set off
-        elif parts[1] == 'off':
-            return {"type": "set_off"}
-        # /set language pair <source> <target>
-        elif len(parts) >= 5 and parts[1] == 'language' and parts[2] == 'pair':
-            source = parts[3]
-            target = parts[4]
-            return {"type": "set_pair", "source": source, "target": target}
-        # /set american
-        elif parts[1] == 'american':
-            return {"type": "set_american"}
-        # /set mandarin
-        elif parts[1] == 'mandarin':
-            return {"type": "set_mandarin"}
-        # /set japanese
-        elif parts[1] == 'japanese':
-            return {"type": "set_japanese"}
-    
-    # /status
-    if command == '/status':
-        if len(parts) >= 2 and parts[1] == 'version':
-            return {"type": "status_version"}
-        elif len(parts) >= 2 and parts[1] == 'help':
-            return {"type": "status_help"}
-        return {"type": "status"}
+    for length in _COMMAND_KEY_LENGTHS:
+        build = _COMMAND_TABLE.get(tuple(parts[:length]))
+        if build is not None:
+            cmd_info = build(parts)
+            return MappingProxyType(cmd_info) if cmd_info is not None else None
     
     return None
 
@@ -294,6 +741,7 @@ def get_user_display_name(user_id: str, group_id: Optional[str] = None) -> Optio
     
     Returns None if profile cannot be retrieved (user not added as friend,
     user blocked the bot, or API error).
+    Lookups are cached in-process; see _DISPLAY_NAME_TTL.
     
     Args:
         user_id: Unique LINE user ID
@@ -303,9 +751,38 @@ def get_user_display_name(user_id: str, group_id: Optional[str] = None) -> Optio
         User's display name or None if unavailable
     """
     if not CHANNEL_ACCESS_TOKEN:
-        print("ERROR: CHANNEL_ACCESS_TOKEN not set, cannot retrieve profile")
+        logger.error("CHANNEL_ACCESS_TOKEN not set, cannot retrieve profile")
         return None
     
+    key = (user_id, group_id)
+    with _display_name_cache_lock:
+        entry = _display_name_cache.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            _display_name_cache.move_to_end(key)
+            return entry[1]
+    
+    display_name, cacheable = _fetch_user_display_name(user_id, group_id)
+    if cacheable:
+        ttl = _DISPLAY_NAME_TTL if display_name else _DISPLAY_NAME_MISSING_TTL
+        with _display_name_cache_lock:
+            _display_name_cache[key] = (time.monotonic() + ttl, display_name)
+            _display_name_cache.move_to_end(key)
+            if len(_display_name_cache) > _DISPLAY_NAME_CACHE_MAX_ENTRIES:
+                _display_name_cache.popitem(last=False)
+    return display_name
+
+
+def _fetch_user_display_name(user_id: str, group_id: Optional[str]) -> tuple[Optional[str], bool]:
+    """
+    Request a display name from the LINE profile API.
+    
+    Args:
+        user_id: Unique LINE user ID
+        group_id: Optional group ID for group chat contexts
+    
+    Returns:
+        (display name or None, whether the outcome may be cached)
+    """
     # Determine context and URL before try block to avoid unbound variable errors
     if group_id:
         # Group chat: use group member profile endpoint
@@ -317,75 +794,57 @@ def get_user_display_name(user_id: str, group_id: Optional[str] = None) -> Optio
         context = "individual chat"
     
     try:
+        response = _line_http.get(url, timeout=10)
+        if response.status_code == 200:
+            profile_data = orjson.loads(response.content)
+            display_name = profile_data.get("displayName")
+            if display_name:
+                logger.debug("Retrieved display name '%s' for user %s in %s", display_name, user_id, context)
+            return display_name, True
         
-        headers = {
-            "Authorization": f"Bearer {CHANNEL_ACCESS_TOKEN}",
-            "Content-Type": "application/json"
-        }
-        
-        req = urllib.request.Request(url, headers=headers)
-        with urllib.request.urlopen(req, timeout=10) as response:
-            if response.status == 200:
-                profile_data = json.loads(response.read().decode())
-                display_name = profile_data.get("displayName")
-                if display_name:
-                    print(f"✓ Retrieved display name '{display_name}' for user {user_id} in {context}")
-                return display_name
-            else:
-                print(f"WARNING: Unexpected status {response.status} when retrieving profile for user {user_id} in {context}")
-                return None
-                
-    except urllib.error.HTTPError as e:
         # Detailed error handling for different HTTP status codes
-        error_body = None
-        try:
-            error_body = e.read().decode()
-        except:
-            pass
-        
-        if e.code == 400:
-            print(f"ERROR: Bad request when retrieving profile for user {user_id} in {context}: {e.code} {e.reason}")
+        error_body = response.text
+        if response.status_code == 400:
+            logger.error("Bad request when retrieving profile for user %s in %s: %s %s", user_id, context, response.status_code, response.reason)
             if error_body:
-                print(f"  Error details: {error_body}")
-        elif e.code == 401:
-            print(f"ERROR: Authentication failed when retrieving profile. Check CHANNEL_ACCESS_TOKEN.")
-        elif e.code == 403:
-            print(f"ERROR: Forbidden - bot may not have permission to access profile for user {user_id} in {context}")
-        elif e.code == 404:
+                logger.error("Error details: %s", error_body)
+        elif response.status_code == 401:
+            logger.error("Authentication failed when retrieving profile. Check CHANNEL_ACCESS_TOKEN.")
+        elif response.status_code == 403:
+            logger.error("Forbidden - bot may not have permission to access profile for user %s in %s", user_id, context)
+            return None, True
+        elif response.status_code == 404:
             # User might not have added bot as friend, or blocked the bot, or not in group
-            print(f"INFO: Profile not found for user {user_id} in {context} (user may not have added bot, blocked bot, or not in group)")
+            logger.info("Profile not found for user %s in %s (user may not have added bot, blocked bot, or not in group)", user_id, context)
+            return None, True
         else:
-            print(f"ERROR: HTTP {e.code} {e.reason} when retrieving profile for user {user_id} in {context}")
+            logger.error("HTTP %s %s when retrieving profile for user %s in %s", response.status_code, response.reason, user_id, context)
             if error_body:
-                print(f"  Error details: {error_body}")
+                logger.error("Error details: %s", error_body)
                 
-    except urllib.error.URLError as e:
-        print(f"ERROR: Network error when retrieving profile for user {user_id}: {e.reason}")
-    except json.JSONDecodeError as e:
-        print(f"ERROR: Invalid JSON response when retrieving profile for user {user_id}: {e}")
-    except Exception as e:
-        print(f"ERROR retrieving user profile for {user_id}: {e}")
-        print(traceback.format_exc())
+    except requests.RequestException as e:
+        logger.error("Network error when retrieving profile for user %s: %s", user_id, e)
+    except orjson.JSONDecodeError as e:
+        logger.error("Invalid JSON response when retrieving profile for user %s: %s", user_id, e)
+    except Exception:
+        logger.exception("Error retrieving user profile for %s", user_id)
     
-    return None
+    return None, False
 
 
 def send_reply(reply_token: str, text: str) -> None:
     """Send reply message to user."""
     try:
-        with ApiClient(configuration) as api_client:
-            line_bot_api = MessagingApi(api_client)
-            # LINE Bot SDK v3 uses replyToken (camelCase) in the API
-            # quickReply and quoteToken are optional parameters
-            request = ReplyMessageRequest(
-                replyToken=reply_token,  # type: ignore
-                messages=[TextMessage(text=text)],  # type: ignore
-                **{"quickReply": None, "quoteToken": None}  # type: ignore
-            )
-            line_bot_api.reply_message(request)
-    except Exception as e:
-        print(f"ERROR sending reply: {e}")
-        print(traceback.format_exc())
+        # The arguments are always well-formed here, so build the SDK models with
+        # construct() and skip pydantic validation; optional fields stay at their defaults.
+        # construct() bypasses the subclass __init__, so the message type is set explicitly
+        request = ReplyMessageRequest.construct(
+            reply_token=reply_token,
+            messages=[TextMessage.construct(type="text", text=text)]
+        )
+        _line_bot_api.reply_message(request)
+    except Exception:
+        logger.exception("Error sending reply")
 
 
 def is_voice_translation_enabled(settings: Dict[str, Any]) -> bool:
@@ -414,11 +873,9 @@ def is_voice_translation_enabled(settings: Dict[str, Any]) -> bool:
     if mode == "pair":
         source_lang = settings.get("source_lang")
         target_lang = settings.get("target_lang")
-        # Supported languages for voice translation
-        supported_languages = ["en", "zh-TW", "es", "ja", "th", "id"]
         # Check if both languages are set and supported
         if source_lang and target_lang:
-            if source_lang in supported_languages and target_lang in supported_languages:
+            if source_lang in _SUPPORTED_LANGUAGE_CODES and target_lang in _SUPPORTED_LANGUAGE_CODES:
                 return True
     
     # American mode: translate any language to English
@@ -461,23 +918,13 @@ def handle_off_command(user_id: str, reply_token: str, group_id: Optional[str] =
 
 def normalize_language_code(code: str) -> str:
     """Normalize language code to Google Cloud format (case-insensitive input)."""
-    code_lower = code.lower()
-    # Map lowercase inputs to proper Google Cloud format
-    code_map = {
-        "en": "en",
-        "zh-tw": "zh-TW",
-        "zh-cn": "zh-TW",  # Map zh-cn to zh-TW (we only support Traditional Chinese)
-        "es": "es",
-        "ja": "ja",
-        "jpn": "ja",  # Also accept jpn
-        "th": "th",
-        "id": "id",
-        "ind": "id"  # Also accept ind
-    }
-    return code_map.get(code_lower, code)  # Return original if not in map
-
-
-def handle_set_command(cmd_info: Dict[str, Any], user_id: str, reply_token: str, group_id: Optional[str] = None) -> None:
+    normalized = _LANGUAGE_CODE_MAP.get(code)
+    if normalized is not None:
+        return normalized
+    return _LANGUAGE_CODE_MAP.get(code.lower(), code)  # Return original if not in map
+
+
+def handle_set_command(cmd_info: Mapping[str, Any], user_id: str, reply_token: str, group_id: Optional[str] = None) -> None:
     """Handle /set commands."""
     if cmd_info["type"] == "set_on":
         # /set on - enable translation
@@ -505,18 +952,13 @@ def handle_set_command(cmd_info: Dict[str, Any], user_id: str, reply_token: str,
         source = normalize_language_code(source_input)
         target = normalize_language_code(target_input)
         
-        # Supported Google Cloud language codes (proper format)
-        supported_codes = ["en", "zh-TW", "es", "ja", "th", "id"]
-        
         # Validate language codes
-        if source not in supported_codes:
-            supported = ", ".join(supported_codes)
-            send_reply(reply_token, f"Invalid source language code: {source_input}\nSupported: {supported}")
+        if source not in _SUPPORTED_LANGUAGE_CODES:
+            send_reply(reply_token, f"Invalid source language code: {source_input}\nSupported: {_SUPPORTED_LANGUAGES_TEXT}")
             return
         
-        if target not in supported_codes:
-            supported = ", ".join(supported_codes)
-            send_reply(reply_token, f"Invalid target language code: {target_input}\nSupported: {supported}")
+        if target not in _SUPPORTED_LANGUAGE_CODES:
+            send_reply(reply_token, f"Invalid target language code: {target_input}\nSupported: {_SUPPORTED_LANGUAGES_TEXT}")
             return
         
         # Use Google Cloud codes directly (now properly normalized)
@@ -650,6 +1092,43 @@ def handle_status_command(user_id: str, reply_token: str, group_id: Optional[str
     send_reply(reply_token, "\n".join(status_lines))
 
 
+def _handle_status(cmd_info: Mapping[str, Any], user_id: str, reply_token: str, group_id: Optional[str] = None) -> None:
+    """Adapt handle_status_command to the command-handler signature."""
+    handle_status_command(user_id, reply_token, group_id, cmd_info["type"])
+
+
+# Command type (from parse_switch_command) -> handler(cmd_info, user_id, reply_token, group_id)
+_COMMAND_HANDLERS: Dict[str, Callable[[Mapping[str, Any], str, str, Optional[str]], None]] = {
+    "set_on": handle_set_command,
+    "set_off": handle_set_command,
+    "set_pair": handle_set_command,
+    "set_american": handle_set_command,
+    "set_mandarin": handle_set_command,
+    "set_japanese": handle_set_command,
+    "status": _handle_status,
+    "status_version": _handle_status,
+    "status_help": _handle_status,
+}
+
+
+# Regex pattern for emoji Unicode ranges
+# This covers most emoji ranges including:
+# - Emoticons and symbols
+# - Miscellaneous symbols and pictographs
+# - Supplemental symbols and pictographs
+# - Symbols and pictographs extended-A
+# - Skin tone modifiers
+# - Variation selectors
+# - Zero-width joiner (for composite emojis)
+_EMOJI_RE = re.compile(
+    r'^[\U0001F300-\U0001F9FF\U00002600-\U000026FF\U00002700-\U000027BF'
+    r'\U0001F600-\U0001F64F\U0001F680-\U0001F6FF\U0001F1E0-\U0001F1FF'
+    r'\U0001FA00-\U0001FA6F\U0001FA70-\U0001FAFF\U0000200D'
+    r'\U0000FE00-\U0000FE0F\U0001F3FB-\U0001F3FF\U000020E3\s]*$',
+    re.UNICODE
+)
+
+
 def is_emoji_only(message: str) -> bool:
     """
     Check if message contains only emojis/LINE icons (no regular text).
@@ -667,42 +1146,93 @@ def is_emoji_only(message: str) -> bool:
     if not stripped:
         return True
     
-    # Regex pattern for emoji Unicode ranges
-    # This covers most emoji ranges including:
-    # - Emoticons and symbols
-    # - Miscellaneous symbols and pictographs
-    # - Supplemental symbols and pictographs
-    # - Symbols and pictographs extended-A
-    # - Skin tone modifiers
-    # - Variation selectors
-    # - Zero-width joiner (for composite emojis)
-    emoji_pattern = re.compile(
-        r'^[\U0001F300-\U0001F9FF\U00002600-\U000026FF\U00002700-\U000027BF'
-        r'\U0001F600-\U0001F64F\U0001F680-\U0001F6FF\U0001F1E0-\U0001F1FF'
-        r'\U0001FA00-\U0001FA6F\U0001FA70-\U0001FAFF\U0000200D'
-        r'\U0000FE00-\U0000FE0F\U0001F3FB-\U0001F3FF\U000020E3\s]*$',
-        re.UNICODE
-    )
+    # Every non-whitespace character in the pattern is at or above U+200D, so ordinary
+    # Latin-script text is rejected from its first character without running the regex
+    if ord(stripped[0]) < 0x200D:
+        return False
     
     # Check if the entire message matches emoji pattern
-    return bool(emoji_pattern.match(stripped))
+    return bool(_EMOJI_RE.match(stripped))
+
+def is_duplicate_event(event) -> bool:
+    """
+    Record the event's message ID and report whether it was already seen.
+    
+    Args:
+        event: LINE webhook event
+    
+    Returns:
+        True if a message with the same ID was handled recently
+    """
+    message = getattr(event, "message", None)
+    message_id = getattr(message, "id", None)
+    if message_id is None:
+        return False
+    with _seen_message_ids_lock:
+        if message_id in _seen_message_ids:
+            return True
+        _seen_message_ids[message_id] = None
+        if len(_seen_message_ids) > _SEEN_MESSAGE_IDS_MAX:
+            _seen_message_ids.popitem(last=False)
+    return False
+
+
+def _event_finished(_future: Future) -> None:
+    """Release the event's queue slot once its handler completes."""
+    global _events_pending
+    with _events_pending_lock:
+        _events_pending -= 1
+    _event_slots.release()
+
+
+def run_concurrently(func: Callable[[Any], None]) -> Callable[[Any], None]:
+    """
+    Run an event handler on the shared event pool instead of inline.
+    
+    The webhook route returns as soon as every event is queued, so LINE gets
+    its 200 OK without waiting on translation. Events arriving while the pool
+    is saturated are dropped with a warning, as are redelivered messages.
+    """
+    @functools.wraps(func)
+    def wrapper(event):
+        if is_duplicate_event(event):
+            logger.info("Skipping redelivered message %s", event.message.id)
+            return
+        global _events_pending
+        if not _event_slots.acquire(blocking=False):
+            logger.warning(
+                "Event pool saturated (%d pending), dropping %s event",
+                _EVENT_QUEUE_LIMIT, type(event).__name__
+            )
+            return
+        with _events_pending_lock:
+            _events_pending += 1
+            depth = _events_pending
+        logger.debug("Queued %s event, queue depth %d", type(event).__name__, depth)
+        future = _event_executor.submit(func, event)
+        future.add_done_callback(_event_finished)
+    return wrapper
+
 
 @app.route("/webhook", methods=['POST'])
 def webhook():
     signature = request.headers.get('X-Line-Signature', '')
-    body = request.get_data(as_text=True)
+    # Read the raw bytes without Flask keeping its own copy in request.data;
+    # the v3 SDK signs and parses a str, so decode exactly once here
+    body = request.get_data(cache=False).decode("utf-8")
     try:
+        # Handlers only queue their work, so this returns right after validation
         handler.handle(body, signature)
     except InvalidSignatureError:
-        app.logger.info("Invalid signature. Please check your channel access token/channel secret.")
+        logger.warning("Invalid signature. Please check your channel access token/channel secret.")
         abort(400)
-    except Exception as e:
-        print(f"ERROR in webhook handler: {e}")
-        print(traceback.format_exc())
+    except Exception:
+        logger.exception("Error in webhook handler")
         abort(500)
     return 'OK'
 
 @handler.add(MessageEvent, message=TextMessageContent)
+@run_concurrently
 def handle_message(event):
     try:
         user_message = event.message.text
@@ -711,61 +1241,67 @@ def handle_message(event):
         user_id = event.source.user_id if hasattr(event.source, 'user_id') else None
         
         if not user_id:
-            print("WARNING: Could not extract user_id from event")
-            print(f"Event source type: {type(event.source)}")
+            logger.warning("Could not extract user_id from event")
+            logger.warning("Event source type: %s", type(event.source))
             return
         
         # Check if this is a group chat
         group_id = None
         if isinstance(event.source, GroupSource):
             group_id = event.source.group_id
-            print(f"Message received in group: {group_id} from user: {user_id}")
+            logger.info("Message received in group: %s from user: %s", group_id, user_id)
         
         # Check if message is a switch command
         cmd_info = parse_switch_command(user_message)
         if cmd_info:
-            if cmd_info["type"] in ["set_on", "set_off", "set_pair", "set_american", "set_mandarin", "set_japanese"]:
-                handle_set_command(cmd_info, user_id, event.reply_token, group_id)
-            elif cmd_info["type"] in ["status", "status_version", "status_help"]:
-                handle_status_command(user_id, event.reply_token, group_id, cmd_info["type"])
+            command_handler = _COMMAND_HANDLERS.get(cmd_info["type"])
+            if command_handler:
+                command_handler(cmd_info, user_id, event.reply_token, group_id)
             return
         
         # Skip translation if message contains only emojis/LINE icons
         if is_emoji_only(user_message):
-            print(f"Skipping translation for emoji-only message from user {user_id}")
+            logger.info("Skipping translation for emoji-only message from user %s", user_id)
             return
         
-        # Skip translation if message contains only emojis/LINE icons
-        if is_emoji_only(user_message):
-            print(f"Skipping translation for emoji-only message from user {user_id}")
+        # Not a command, apply translation based on settings
+        # Chats that never enabled translation are skipped without a settings read
+        if is_translation_known_disabled(f"group:{group_id}" if group_id else user_id):
             return
         
-        # Not a command, apply translation based on settings
         # In group chats, use group settings; otherwise use user settings
         if group_id:
             settings = get_group_setting(group_id)
         else:
             settings = get_user_setting(user_id)
         
+        # Most chats have translation off; skip the translation call entirely
+        if not settings.get("enabled"):
+            return
+        
+        # Fetch the sender's display name while the translation is in flight
+        # Pass group_id for proper profile retrieval in group chats
+        display_name_future = _io_executor.submit(get_user_display_name, user_id, group_id)
+        
         translated = detect_and_translate(
             user_message,
-            enabled=settings["enabled"],
             source_lang=settings.get("source_lang"),
             target_lang=settings.get("target_lang"),
             mode=settings.get("mode", "pair")
         )
         
         # Only send reply if translation occurred and is different from original
-        if translated != user_message and settings["enabled"]:
-            # Try to get user's display name, fallback to user ID if unavailable
-            # Pass group_id for proper profile retrieval in group chats
-            display_name = get_user_display_name(user_id, group_id)
+        if translated != user_message:
+            # Use the user's display name, fallback to user ID if unavailable
+            try:
+                display_name = display_name_future.result(timeout=10)
+            except Exception:
+                display_name = None
             user_identifier = display_name if display_name else f"User ID: {user_id}"
             reply_text = f"{user_identifier}:\n{translated}"
             send_reply(event.reply_token, reply_text)
-    except Exception as e:
-        print(f"ERROR in handle_message: {e}")
-        print(traceback.format_exc())
+    except Exception:
+        logger.exception("Error in handle_message")
 
 
 @handler.add(MessageEvent, message=StickerMessageContent)
@@ -774,15 +1310,134 @@ def handle_sticker_message(event):
     try:
         user_id = event.source.user_id if hasattr(event.source, 'user_id') else None
         if user_id:
-            print(f"Skipping translation for sticker message from user {user_id}")
+            logger.info("Skipping translation for sticker message from user %s", user_id)
         # Stickers are not translated, just return
         return
+    except Exception:
+        logger.exception("Error in handle_sticker_message")
+
+
+def _recognize_in_order(
+    audio_content: bytes, attempts: List[tuple], recognition_errors: List[str]
+) -> Optional[tuple]:
+    """
+    Recognize a clip with each attempt in turn, stopping at the first transcript.
+    
+    Attempts run one after another on the calling thread, in priority order; the
+    next one is only started (and billed) when the previous one fails or returns
+    an empty transcript. A fallback costs an extra round trip of latency, but no
+    recognition is ever paid for and then discarded. The clip is staged once and
+    shared by every attempt.
+    
+    Args:
+        audio_content: Audio file content as bytes
+        attempts: (label, primary language code, alternative language codes) tuples,
+            highest priority first; label names the attempt in errors and the result
+        recognition_errors: List that failed attempts are appended to
+    
+    Returns:
+        Tuple of (transcript, recognized language code in lower case, label of the
+        successful attempt), or None if every attempt failed
+    """
+    audio, release_audio = stage_recognition_audio(audio_content)
+    try:
+        for label, primary, alternatives in attempts:
+            logger.info("Attempting speech recognition with %s and alternatives: %s", primary, alternatives)
+            try:
+                transcribed_text, recognized_language = recognize_speech(
+                    audio_content, primary, alternative_language_codes=list(alternatives), audio=audio
+                )
+                if transcribed_text and transcribed_text.strip():
+                    return transcribed_text, recognized_language, label
+                raise Exception("Recognition returned empty transcript")
+            except Exception as e:
+                error_msg = f"Recognition failed for {label}: {str(e)}"
+                logger.warning("%s", error_msg)
+                recognition_errors.append(error_msg)
+        return None
+    finally:
+        release_audio()
+
+
+def _is_mode_language(mode: str, recognized_language: Optional[str]) -> bool:
+    """True when speech was recognized in the language a translate-anything mode translates into."""
+    return recognized_language == _STT_MODE_GROUPS[mode][0][0].lower()
+
+
+def _handle_voice_mode(event, audio_content: bytes, user_identifier: str, mode: str) -> None:
+    """
+    Recognize, translate and reply to a voice message in American, Mandarin or Japanese mode.
+    
+    Args:
+        event: LINE audio message event being answered
+        audio_content: Downloaded audio file content as bytes
+        user_identifier: Sender label prefixed to the reply
+        mode: "american", "mandarin" or "japanese"
+    """
+    mode_label = mode.capitalize()
+    target_lang, target_name = _VOICE_MODE_TARGETS[mode]
+    recognition_errors: List[str] = []
+    
+    # Try language groups to detect any language, top-priority group first
+    attempts = [
+        (f"language group starting with {primary}", primary, alternatives)
+        for primary, alternatives in _STT_MODE_GROUPS[mode]
+    ]
+    recognition = _recognize_in_order(audio_content, attempts, recognition_errors)
+    transcribed_text, recognized_language, _label = recognition if recognition else (None, None, None)
+    if transcribed_text:
+        logger.debug("Speech recognized (%s mode, %s): %s", mode_label, recognized_language, transcribed_text)
+    
+    # If all attempts failed, send error message
+    if not transcribed_text or not transcribed_text.strip():
+        error_details = "\n".join(recognition_errors[-3:]) if recognition_errors else "Unknown error"  # Show last 3 errors
+        logger.warning("All speech recognition attempts failed (%s mode). Errors: %s", mode_label, error_details)
+        send_reply(event.reply_token, _SPEECH_NOT_RECOGNIZED_REPLY)
+        return
+    
+    # Translate transcribed text to the mode's language
+    try:
+        # Speech already recognized in the mode's language needs no translation call
+        if _is_mode_language(mode, recognized_language):
+            translated_text = transcribed_text
+        else:
+            translated_text = detect_and_translate(
+                transcribed_text,
+                source_lang=None,  # Let it auto-detect
+                target_lang=target_lang,
+                mode=mode
+            )
+        
+        logger.debug("Translated (%s mode): %s -> %s", mode_label, transcribed_text, translated_text)
+        
     except Exception as e:
-        print(f"ERROR in handle_sticker_message: {e}")
-        print(traceback.format_exc())
+        logger.error("Error translating text (%s mode): %s", mode_label, e)
+        # Fallback: send transcribed text
+        send_reply(
+            event.reply_token,
+            f"{user_identifier}:\nTranscribed: {transcribed_text}\n(Translation to {target_name} failed)"
+        )
+        return
+    
+    # Send translated text
+    try:
+        reply_text = f"{user_identifier}:\n{translated_text}"
+        send_reply(event.reply_token, reply_text)
+        
+        logger.info("Voice translation completed (%s mode)", mode_label)
+        logger.debug("Original: %s", transcribed_text)
+        logger.debug("Translated: %s", translated_text)
+        
+    except Exception:
+        logger.exception("Error sending reply")
+        try:
+            send_reply(event.reply_token, f"{user_identifier}:\n{translated_text}")
+        except:
+            pass
 
 
 @handler.add(MessageEvent, message=AudioMessageContent)
+@run_concurrently
 def handle_audio_message(event):
     """
     Handle audio/voice messages for voice translation.
@@ -797,18 +1452,14 @@ def handle_audio_message(event):
         user_id = event.source.user_id if hasattr(event.source, 'user_id') else None
         
         if not user_id:
-            print("WARNING: Could not extract user_id from audio event")
+            logger.warning("Could not extract user_id from audio event")
             return
         
         # Check if this is a group chat
         group_id = None
         if isinstance(event.source, GroupSource):
             group_id = event.source.group_id
-            print(f"Audio message received in group: {group_id} from user: {user_id}")
-        
-        # Get user's display name for reply messages (fallback to user ID if unavailable)
-        display_name = get_user_display_name(user_id, group_id)
-        user_identifier = display_name if display_name else f"User ID: {user_id}"
+            logger.info("Audio message received in group: %s from user: %s", group_id, user_id)
         
         # Get user/group settings
         if group_id:
@@ -823,41 +1474,10 @@ def handle_audio_message(event):
             source_lang = settings.get("source_lang")
             target_lang = settings.get("target_lang")
             
-            if mode == "american":
-                send_reply(
-                    event.reply_token,
-                    "Voice translation is not enabled.\n"
-                    "Please enable translation using:\n"
-                    "/set american"
-                )
-            elif mode == "mandarin":
-                send_reply(
-                    event.reply_token,
-                    "Voice translation is not enabled.\n"
-                    "Please enable translation using:\n"
-                    "/set mandarin"
-                )
-            elif mode == "japanese":
-                send_reply(
-                    event.reply_token,
-                    "Voice translation is not enabled.\n"
-                    "Please enable translation using:\n"
-                    "/set japanese"
-                )
+            if mode in _VOICE_NOT_ENABLED_REPLIES:
+                send_reply(event.reply_token, _VOICE_NOT_ENABLED_REPLIES[mode])
             elif not source_lang or not target_lang:
-                send_reply(
-                    event.reply_token,
-                    "Voice translation requires a language pair to be set.\n"
-                    "Please set a language pair using:\n"
-                    "/set language pair <source> <target>\n\n"
-                    "Or use American mode:\n"
-                    "/set american\n\n"
-                    "Or use Mandarin mode:\n"
-                    "/set mandarin\n\n"
-                    "Or use Japanese mode:\n"
-                    "/set japanese\n\n"
-                    "Supported languages for pair mode: en, zh-TW, es, ja, th, id"
-                )
+                send_reply(event.reply_token, _VOICE_PAIR_REQUIRED_REPLY)
             else:
                 send_reply(
                     event.reply_token,
@@ -877,348 +1497,32 @@ def handle_audio_message(event):
             send_reply(event.reply_token, "Error: Channel access token not configured.")
             return
         
+        # Fetch the sender's display name while the audio downloads
+        display_name_future = _io_executor.submit(get_user_display_name, user_id, group_id)
+        
         # Download audio from LINE
         try:
             audio_content = download_line_audio(message_id, CHANNEL_ACCESS_TOKEN)
         except Exception as e:
-            print(f"ERROR downloading audio: {e}")
+            logger.error("Error downloading audio: %s", e)
             send_reply(event.reply_token, "Could not download audio. Please try again.")
             return
         
+        # Use the user's display name for reply messages, fallback to user ID if unavailable
+        try:
+            display_name = display_name_future.result(timeout=10)
+        except Exception:
+            display_name = None
+        user_identifier = display_name if display_name else f"User ID: {user_id}"
+        
         mode = settings.get("mode")
         transcribed_text = None
         detected_language = None
         recognition_errors = []
         
-        # Handle american mode
-        if mode == "american":
-            # American mode: try multiple languages to detect any language
-            # Google Cloud Speech-to-Text supports up to 4 alternative languages per request
-            # We'll try language groups sequentially
-            
-            # Try first group: English + top 4 alternatives
-            primary_lang = AMERICAN_MODE_LANGUAGES[0]
-            alternative_langs = AMERICAN_MODE_LANGUAGES[1:5]  # Max 4 alternatives
-            
-            print(f"Attempting speech recognition (American mode) with {primary_lang} and alternatives: {alternative_langs}")
-            try:
-                transcribed_text = speech_to_text(audio_content, primary_lang, alternative_language_codes=alternative_langs)
-                if transcribed_text and transcribed_text.strip():
-                    print(f"✓ Speech recognized (American mode): {transcribed_text}")
-                else:
-                    raise Exception("Recognition returned empty transcript")
-            except Exception as e:
-                error_msg = f"Recognition failed for first language group: {str(e)}"
-                print(error_msg)
-                recognition_errors.append(error_msg)
-                transcribed_text = None
-            
-            # If first group failed, try next groups (5 languages per group)
-            if not transcribed_text:
-                for group_start in range(5, len(AMERICAN_MODE_LANGUAGES), 5):
-                    group_languages = AMERICAN_MODE_LANGUAGES[group_start:group_start + 5]
-                    if not group_languages:
-                        break
-                    
-                    primary = group_languages[0]
-                    alternatives = group_languages[1:5]  # Max 4 alternatives
-                    
-                    print(f"Attempting speech recognition (American mode) with {primary} and alternatives: {alternatives}")
-                    try:
-                        transcribed_text = speech_to_text(audio_content, primary, alternative_language_codes=alternatives)
-                        if transcribed_text and transcribed_text.strip():
-                            print(f"✓ Speech recognized (American mode): {transcribed_text}")
-                            break
-                        else:
-                            raise Exception("Recognition returned empty transcript")
-                    except Exception as e:
-                        error_msg = f"Recognition failed for language group starting with {primary}: {str(e)}"
-                        print(error_msg)
-                        recognition_errors.append(error_msg)
-                        continue
-            
-            # If all attempts failed, send error message
-            if not transcribed_text or not transcribed_text.strip():
-                error_details = "\n".join(recognition_errors[-3:]) if recognition_errors else "Unknown error"  # Show last 3 errors
-                print(f"All speech recognition attempts failed (American mode). Errors: {error_details}")
-                send_reply(
-                    event.reply_token,
-                    "Could not recognize speech. Please ensure:\n"
-                    "- Audio is clear and not too quiet\n"
-                    "- You're speaking in a supported language\n"
-                    "- Try speaking more slowly or clearly\n\n"
-                    "Note: Only languages supported by Google Cloud Speech-to-Text can be recognized."
-                )
-                return
-            
-            # Translate transcribed text to English using american mode
-            try:
-                translated_text = detect_and_translate(
-                    transcribed_text,
-                    enabled=True,
-                    source_lang=None,  # Let it auto-detect
-                    target_lang="en-US",
-                    mode="american"
-                )
-                
-                print(f"Translated (American mode): {transcribed_text} -> {translated_text}")
-                
-            except Exception as e:
-                print(f"ERROR translating text (American mode): {e}")
-                # Fallback: send transcribed text
-                send_reply(
-                    event.reply_token,
-                    f"{user_identifier}:\nTranscribed: {transcribed_text}\n(Translation to English failed)"
-                )
-                return
-            
-            # Send translated text
-            try:
-                reply_text = f"{user_identifier}:\n{translated_text}"
-                send_reply(event.reply_token, reply_text)
-                
-                print(f"Voice translation completed (American mode)")
-                print(f"Original: {transcribed_text}")
-                print(f"Translated: {translated_text}")
-                
-            except Exception as e:
-                print(f"ERROR sending reply: {e}")
-                print(traceback.format_exc())
-                try:
-                    send_reply(event.reply_token, f"{user_identifier}:\n{translated_text}")
-                except:
-                    pass
-            
-            return
-        
-        # Handle mandarin mode
-        if mode == "mandarin":
-            # Mandarin mode: try multiple languages to detect any language
-            # Google Cloud Speech-to-Text supports up to 4 alternative languages per request
-            # We'll try language groups sequentially
-            
-            # Try first group: Traditional Chinese + top 4 alternatives
-            primary_lang = "zh-TW"
-            alternative_langs = AMERICAN_MODE_LANGUAGES[:4]  # Use first 4 from the list (excluding zh-TW if present)
-            # Remove zh-TW from alternatives if it's there, and ensure we have 4 alternatives
-            alternative_langs = [lang for lang in alternative_langs if lang != "zh-TW"][:4]
-            if len(alternative_langs) < 4:
-                # Add more languages if needed
-                additional = [lang for lang in AMERICAN_MODE_LANGUAGES[4:] if lang != "zh-TW"][:4-len(alternative_langs)]
-                alternative_langs.extend(additional)
-            
-            print(f"Attempting speech recognition (Mandarin mode) with {primary_lang} and alternatives: {alternative_langs}")
-            try:
-                transcribed_text = speech_to_text(audio_content, primary_lang, alternative_language_codes=alternative_langs)
-                if transcribed_text and transcribed_text.strip():
-                    print(f"✓ Speech recognized (Mandarin mode): {transcribed_text}")
-                else:
-                    raise Exception("Recognition returned empty transcript")
-            except Exception as e:
-                error_msg = f"Recognition failed for first language group: {str(e)}"
-                print(error_msg)
-                recognition_errors.append(error_msg)
-                transcribed_text = None
-            
-            # If first group failed, try next groups (5 languages per group)
-            if not transcribed_text:
-                for group_start in range(0, len(AMERICAN_MODE_LANGUAGES), 5):
-                    group_languages = AMERICAN_MODE_LANGUAGES[group_start:group_start + 5]
-                    if not group_languages:
-                        break
-                    
-                    # Skip if zh-TW is already primary
-                    if group_languages[0] == "zh-TW" and group_start == 0:
-                        continue
-                    
-                    primary = group_languages[0]
-                    alternatives = [lang for lang in group_languages[1:5] if lang != "zh-TW"]  # Max 4 alternatives, exclude zh-TW
-                    # Ensure we have alternatives
-                    if len(alternatives) < 4:
-                        additional = [lang for lang in AMERICAN_MODE_LANGUAGES if lang not in alternatives and lang != "zh-TW"][:4-len(alternatives)]
-                        alternatives.extend(additional)
-                    
-                    print(f"Attempting speech recognition (Mandarin mode) with {primary} and alternatives: {alternatives}")
-                    try:
-                        transcribed_text = speech_to_text(audio_content, primary, alternative_language_codes=alternatives)
-                        if transcribed_text and transcribed_text.strip():
-                            print(f"✓ Speech recognized (Mandarin mode): {transcribed_text}")
-                            break
-                        else:
-                            raise Exception("Recognition returned empty transcript")
-                    except Exception as e:
-                        error_msg = f"Recognition failed for language group starting with {primary}: {str(e)}"
-                        print(error_msg)
-                        recognition_errors.append(error_msg)
-                        continue
-            
-            # If all attempts failed, send error message
-            if not transcribed_text or not transcribed_text.strip():
-                error_details = "\n".join(recognition_errors[-3:]) if recognition_errors else "Unknown error"  # Show last 3 errors
-                print(f"All speech recognition attempts failed (Mandarin mode). Errors: {error_details}")
-                send_reply(
-                    event.reply_token,
-                    "Could not recognize speech. Please ensure:\n"
-                    "- Audio is clear and not too quiet\n"
-                    "- You're speaking in a supported language\n"
-                    "- Try speaking more slowly or clearly\n\n"
-                    "Note: Only languages supported by Google Cloud Speech-to-Text can be recognized."
-                )
-                return
-            
-            # Translate transcribed text to Traditional Chinese using mandarin mode
-            try:
-                translated_text = detect_and_translate(
-                    transcribed_text,
-                    enabled=True,
-                    source_lang=None,  # Let it auto-detect
-                    target_lang="zh-TW",
-                    mode="mandarin"
-                )
-                
-                print(f"Translated (Mandarin mode): {transcribed_text} -> {translated_text}")
-                
-            except Exception as e:
-                print(f"ERROR translating text (Mandarin mode): {e}")
-                # Fallback: send transcribed text
-                send_reply(
-                    event.reply_token,
-                    f"{user_identifier}:\nTranscribed: {transcribed_text}\n(Translation to Traditional Chinese failed)"
-                )
-                return
-            
-            # Send translated text
-            try:
-                reply_text = f"{user_identifier}:\n{translated_text}"
-                send_reply(event.reply_token, reply_text)
-                
-                print(f"Voice translation completed (Mandarin mode)")
-                print(f"Original: {transcribed_text}")
-                print(f"Translated: {translated_text}")
-                
-            except Exception as e:
-                print(f"ERROR sending reply: {e}")
-                print(traceback.format_exc())
-                try:
-                    send_reply(event.reply_token, f"{user_identifier}:\n{translated_text}")
-                except:
-                    pass
-            
-            return
-        
-        # Handle japanese mode
-        if mode == "japanese":
-            # Japanese mode: try multiple languages to detect any language
-            # Google Cloud Speech-to-Text supports up to 4 alternative languages per request
-            # We'll try language groups sequentially
-            
-            # Try first group: Japanese + top 4 alternatives
-            primary_lang = "ja-JP"
-            alternative_langs = AMERICAN_MODE_LANGUAGES[:4]  # Use first 4 from the list (excluding ja-JP if present)
-            # Remove ja-JP from alternatives if it's there, and ensure we have 4 alternatives
-            alternative_langs = [lang for lang in alternative_langs if lang != "ja-JP"][:4]
-            if len(alternative_langs) < 4:
-                # Add more languages if needed
-                additional = [lang for lang in AMERICAN_MODE_LANGUAGES[4:] if lang != "ja-JP"][:4-len(alternative_langs)]
-                alternative_langs.extend(additional)
-            
-            print(f"Attempting speech recognition (Japanese mode) with {primary_lang} and alternatives: {alternative_langs}")
-            try:
-                transcribed_text = speech_to_text(audio_content, primary_lang, alternative_language_codes=alternative_langs)
-                if transcribed_text and transcribed_text.strip():
-                    print(f"✓ Speech recognized (Japanese mode): {transcribed_text}")
-                else:
-                    raise Exception("Recognition returned empty transcript")
-            except Exception as e:
-                error_msg = f"Recognition failed for first language group: {str(e)}"
-                print(error_msg)
-                recognition_errors.append(error_msg)
-                transcribed_text = None
-            
-            # If first group failed, try next groups (5 languages per group)
-            if not transcribed_text:
-                for group_start in range(0, len(AMERICAN_MODE_LANGUAGES), 5):
-                    group_languages = AMERICAN_MODE_LANGUAGES[group_start:group_start + 5]
-                    if not group_languages:
-                        break
-                    
-                    # Skip if ja-JP is the primary language (we already tried it)
-                    if group_languages[0] == "ja-JP":
-                        continue
-                    
-                    primary = group_languages[0]
-                    alternatives = [lang for lang in group_languages[1:5] if lang != "ja-JP"]  # Max 4 alternatives, exclude ja-JP
-                    # Ensure we have alternatives
-                    if len(alternatives) < 4:
-                        additional = [lang for lang in AMERICAN_MODE_LANGUAGES if lang not in alternatives and lang != "ja-JP"][:4-len(alternatives)]
-                        alternatives.extend(additional)
-                    
-                    print(f"Attempting speech recognition (Japanese mode) with {primary} and alternatives: {alternatives}")
-                    try:
-                        transcribed_text = speech_to_text(audio_content, primary, alternative_language_codes=alternatives)
-                        if transcribed_text and transcribed_text.strip():
-                            print(f"✓ Speech recognized (Japanese mode): {transcribed_text}")
-                            break
-                        else:
-                            raise Exception("Recognition returned empty transcript")
-                    except Exception as e:
-                        error_msg = f"Recognition failed for language group starting with {primary}: {str(e)}"
-                        print(error_msg)
-                        recognition_errors.append(error_msg)
-                        continue
-            
-            # If all attempts failed, send error message
-            if not transcribed_text or not transcribed_text.strip():
-                error_details = "\n".join(recognition_errors[-3:]) if recognition_errors else "Unknown error"  # Show last 3 errors
-                print(f"All speech recognition attempts failed (Japanese mode). Errors: {error_details}")
-                send_reply(
-                    event.reply_token,
-                    "Could not recognize speech. Please ensure:\n"
-                    "- Audio is clear and not too quiet\n"
-                    "- You're speaking in a supported language\n"
-                    "- Try speaking more slowly or clearly\n\n"
-                    "Note: Only languages supported by Google Cloud Speech-to-Text can be recognized."
-                )
-                return
-            
-            # Translate transcribed text to Japanese using japanese mode
-            try:
-                translated_text = detect_and_translate(
-                    transcribed_text,
-                    enabled=True,
-                    source_lang=None,  # Let it auto-detect
-                    target_lang="ja",
-                    mode="japanese"
-                )
-                
-                print(f"Translated (Japanese mode): {transcribed_text} -> {translated_text}")
-                
-            except Exception as e:
-                print(f"ERROR translating text (Japanese mode): {e}")
-                # Fallback: send transcribed text
-                send_reply(
-                    event.reply_token,
-                    f"{user_identifier}:\nTranscribed: {transcribed_text}\n(Translation to Japanese failed)"
-                )
-                return
-            
-            # Send translated text
-            try:
-                reply_text = f"{user_identifier}:\n{translated_text}"
-                send_reply(event.reply_token, reply_text)
-                
-                print(f"Voice translation completed (Japanese mode)")
-                print(f"Original: {transcribed_text}")
-                print(f"Translated: {translated_text}")
-                
-            except Exception as e:
-                print(f"ERROR sending reply: {e}")
-                print(traceback.format_exc())
-                try:
-                    send_reply(event.reply_token, f"{user_identifier}:\n{translated_text}")
-                except:
-                    pass
-            
+        # American, Mandarin and Japanese modes translate any recognized language
+        if mode in _VOICE_MODE_TARGETS:
+            _handle_voice_mode(event, audio_content, user_identifier, mode)
             return
         
         # Handle pair mode (existing logic)
@@ -1231,20 +1535,9 @@ def handle_audio_message(event):
             send_reply(event.reply_token, "Error: Language pair not properly configured.")
             return
         
-        # Map translation language codes to Speech-to-Text language codes
-        # Google Cloud Speech-to-Text uses specific locale codes
-        stt_language_map = {
-            "en": "en-US",
-            "zh-TW": "zh-TW",
-            "es": "es-ES",  # Spanish (Spain), can also use es-MX for Mexico
-            "ja": "ja-JP",
-            "th": "th-TH",
-            "id": "id-ID"
-        }
-        
         # Get Speech-to-Text codes for both languages
-        source_stt_code = stt_language_map.get(source_lang)
-        target_stt_code = stt_language_map.get(target_lang)
+        source_stt_code = _STT_LANGUAGE_MAP.get(source_lang)
+        target_stt_code = _STT_LANGUAGE_MAP.get(target_lang)
         
         # Validate that both languages are supported
         if not source_stt_code or not target_stt_code:
@@ -1261,53 +1554,28 @@ def handle_audio_message(event):
             return
         
         # Try both languages for speech recognition (since we don't know which one was spoken)
-        # First try source language, then target language
-        
-        # Try source language first, with target language as alternative
-        try:
-            print(f"Attempting speech recognition with {source_lang} ({source_stt_code})...")
-            transcribed_text = speech_to_text(audio_content, source_stt_code, alternative_language_codes=[target_stt_code])
-            if transcribed_text and transcribed_text.strip():
-                detected_language = source_lang
-                print(f"✓ Speech recognized in {source_lang}: {transcribed_text}")
-            else:
-                raise Exception("Recognition returned empty transcript")
-        except Exception as e:
-            error_msg = f"Recognition failed for {source_lang}: {str(e)}"
-            print(error_msg)
-            recognition_errors.append(error_msg)
-            transcribed_text = None
-        
-        # If source language failed, try target language with source language as alternative
-        if not transcribed_text:
-            try:
-                print(f"Attempting speech recognition with {target_lang} ({target_stt_code})...")
-                transcribed_text = speech_to_text(audio_content, target_stt_code, alternative_language_codes=[source_stt_code])
-                if transcribed_text and transcribed_text.strip():
-                    detected_language = target_lang
-                    print(f"✓ Speech recognized in {target_lang}: {transcribed_text}")
-                else:
-                    raise Exception("Recognition returned empty transcript")
-            except Exception as e2:
-                error_msg = f"Recognition failed for {target_lang}: {str(e2)}"
-                print(error_msg)
-                recognition_errors.append(error_msg)
+        # Each attempt uses the other language as an alternative, so the source attempt
+        # usually recognizes either one; the target attempt only runs if it fails
+        logger.info("Attempting speech recognition with %s (%s) and %s (%s)...", source_lang, source_stt_code, target_lang, target_stt_code)
+        recognition = _recognize_in_order(
+            audio_content,
+            [
+                (source_lang, source_stt_code, [target_stt_code]),
+                (target_lang, target_stt_code, [source_stt_code]),
+            ],
+            recognition_errors,
+        )
+        if recognition:
+            transcribed_text, _recognized_language, detected_language = recognition
+            logger.debug("Speech recognized in %s: %s", detected_language, transcribed_text)
         
         # If both attempts failed, send error message
         if not transcribed_text or not transcribed_text.strip():
             error_details = "\n".join(recognition_errors) if recognition_errors else "Unknown error"
-            print(f"All speech recognition attempts failed. Errors: {error_details}")
+            logger.warning("All speech recognition attempts failed. Errors: %s", error_details)
             # Get language names for error message
-            lang_names = {
-                "en": "English",
-                "zh-TW": "Traditional Chinese",
-                "es": "Spanish",
-                "ja": "Japanese",
-                "th": "Thai",
-                "id": "Indonesian"
-            }
-            source_name = lang_names.get(source_lang, source_lang)
-            target_name = lang_names.get(target_lang, target_lang)
+            source_name = _LANGUAGE_NAMES.get(source_lang, source_lang)
+            target_name = _LANGUAGE_NAMES.get(target_lang, target_lang)
             
             send_reply(
                 event.reply_token,
@@ -1332,16 +1600,15 @@ def handle_audio_message(event):
             
             translated_text = detect_and_translate(
                 transcribed_text,
-                enabled=True,
                 source_lang=detected_language,
                 target_lang=translation_target,
                 mode="pair"
             )
             
-            print(f"Translated: {transcribed_text} -> {translated_text}")
+            logger.debug("Translated: %s -> %s", transcribed_text, translated_text)
             
         except Exception as e:
-            print(f"ERROR translating text: {e}")
+            logger.error("Error translating text: %s", e)
             # Fallback: send transcribed text
             send_reply(
                 event.reply_token,
@@ -1355,22 +1622,20 @@ def handle_audio_message(event):
             reply_text = f"{user_identifier}:\n{translated_text}"
             send_reply(event.reply_token, reply_text)
             
-            print(f"Voice translation completed: {detected_language} -> {translation_target}")
-            print(f"Original: {transcribed_text}")
-            print(f"Translated: {translated_text}")
+            logger.info("Voice translation completed: %s -> %s", detected_language, translation_target)
+            logger.debug("Original: %s", transcribed_text)
+            logger.debug("Translated: %s", translated_text)
             
-        except Exception as e:
-            print(f"ERROR sending reply: {e}")
-            print(traceback.format_exc())
+        except Exception:
+            logger.exception("Error sending reply")
             # Try to send a simpler message
             try:
                 send_reply(event.reply_token, f"{user_identifier}:\n{translated_text}")
             except:
                 pass  # If we can't send reply, just log the error
             
-    except Exception as e:
-        print(f"ERROR in handle_audio_message: {e}")
-        print(traceback.format_exc())
+    except Exception:
+        logger.exception("Error in handle_audio_message")
         try:
             send_reply(event.reply_token, "An error occurred processing the audio message. Please try again.")
         except: